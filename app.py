@@ -1,16 +1,21 @@
 import streamlit as st
-from bot import generate_prompt, show_cache_clear_button
-from dalle_generator import generate_dalle_image
-from translate import translate_prompt
-from io import BytesIO
-import zipfile
-from reportlab.platypus import SimpleDocTemplate, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-import openai
-import base64
-
-# Load environment variables
-openai.api_key = st.secrets["OPENAI_API_KEY"]
+from bot import generate_prompt_stream, generate_prompt_variants, show_cache_clear_button
+from prompt_engine import generate_offline_prompt, generate_offline_variants, generate_for_items
+import image_store
+from pipeline import bundle_results, localize, localize_variants
+from bundle import BundleWriter
+from batch import build_grid, run_batch
+from presets import CUSTOM_OPTION, THEMES, STYLES, MOODS, LANGUAGES, PLATFORMS, REFINEMENTS, compose_user_prompt
+from image_prompt import analyze_uploaded_image
+import exports
+import identity
+from history_store import history_store, HISTORY, FAVORITE
+from metrics import metrics
+from scheduler import scheduler
+from routing import router
+from jobs import jobs, DONE, FAILED, QUEUED, RUNNING
+import functools
+import json
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Artistic Prompt Generator", layout="wide", page_icon="🎨")
@@ -25,12 +30,6 @@ if "last_optimized_prompt" not in st.session_state:
 if "last_refinement" not in st.session_state:
     st.session_state["last_refinement"] = ""
 
-if "prompt_history" not in st.session_state or not isinstance(st.session_state["prompt_history"], list):
-    st.session_state["prompt_history"] = []
-
-if "favorite_prompts" not in st.session_state or not isinstance(st.session_state["favorite_prompts"], list):
-    st.session_state["favorite_prompts"] = []
-
 # --- DARK THEME ---
 st.markdown("""
     <style>
@@ -70,9 +69,64 @@ div[role="listbox"] { max-height: 65vh !important; }
 """, unsafe_allow_html=True)
 
 # --- SESSION STATE ---
-for key in ["last_prompt", "last_optimized_prompt", "last_refinement", "prompt_history", "favorite_prompts"]:
+for key in ["last_prompt", "last_optimized_prompt", "last_refinement"]:
     if key not in st.session_state:
-        st.session_state[key] = [] if "prompts" in key else ""
+        st.session_state[key] = ""
+if "last_variants" not in st.session_state:
+    st.session_state["last_variants"] = {}
+# Warning about the last generation (e.g. offline fallback), shown with its result
+if "last_notice" not in st.session_state:
+    st.session_state["last_notice"] = None
+# Background job IDs for this session, and the ones already folded into the page
+if "job_ids" not in st.session_state:
+    st.session_state["job_ids"] = []
+if "jobs_applied" not in st.session_state:
+    st.session_state["jobs_applied"] = set()
+
+# History and favorites live in the SQLite store, keyed by the signed-in
+# user, or for anonymous visitors by a signed cookie that survives reloads.
+# Query-string values are never used as an identity.
+def current_user_id():
+    user = getattr(st, "user", None)
+    if user is not None and user.get("email"):
+        return user.get("email")
+    if "anonymous_id" not in st.session_state:
+        cookie = st.context.cookies.get(identity.COOKIE_NAME)
+        if identity.anonymous_id(cookie) is None:
+            cookie = identity.new_cookie()
+        st.session_state["anonymous_id"] = identity.anonymous_id(cookie)
+        # Once per session: (re)set the cookie so the next visit keeps this ID
+        st.html(identity.cookie_script(cookie), unsafe_allow_javascript=True)
+    return st.session_state["anonymous_id"]
+
+user_id = current_user_id()
+HISTORY_PAGE_SIZE = 10
+
+# --- BACKGROUND JOB RESULTS ---
+JOB_POLL_SECONDS = 2
+JOB_ICONS = {QUEUED: "🕒", RUNNING: "⏳", DONE: "✅", FAILED: "⚠️"}
+JOB_TITLES = {"dalle": "DALL·E image", "vision": "Image to prompt"}
+
+def apply_finished_jobs():
+    """
+    Fold each finished job into the page once: an analyzed image becomes the
+    current prompt. Image jobs need nothing here; their files are already stored.
+    """
+    applied = st.session_state["jobs_applied"]
+    for job in jobs.get_many(st.session_state["job_ids"]):
+        if job.pending or job.id in applied:
+            continue
+        applied.add(job.id)
+        if job.kind == "vision" and job.status == DONE:
+            image_prompt, _ = job.result
+            st.session_state["last_prompt"] = image_prompt
+            st.session_state["last_optimized_prompt"] = ""
+            st.session_state["last_refinement"] = "🔥 Raw creative prompt"
+            st.session_state["last_variants"] = {}
+            st.session_state["last_notice"] = None
+            history_store.add(user_id, image_prompt)
+
+apply_finished_jobs()
 
 # --- UI TITLE ---
 st.markdown("## 🎨 Multi-Platform Artistic Prompt Generator")
@@ -85,12 +139,12 @@ show_cache_clear_button()
 def combo_select(label: str, options: list[str], key_prefix: str) -> str:
     preset = st.selectbox(
         label,
-        ["✏️ Type your own…"] + options,
+        [CUSTOM_OPTION] + options,
         index=0,
         key=f"{key_prefix}_preset",
         placeholder=f"Pick {label.lower()} or type your own…",
     )
-    if preset == "✏️ Type your own…":
+    if preset == CUSTOM_OPTION:
         custom = st.text_input(
             f"{label} (custom)",
             key=f"{key_prefix}_custom",
@@ -102,206 +156,221 @@ def combo_select(label: str, options: list[str], key_prefix: str) -> str:
         st.session_state[f"{key_prefix}_custom"] = ""
         return preset
 
+# --- PAGE SECTIONS ---
+# Each section is an st.fragment, so a widget inside it reruns only that
+# section. Sections share state through st.session_state only; one that
+# changes what other sections show (a new prompt, a queued job) asks for a
+# full rerun with st.rerun().
+def section(name, **fragment_kwargs):
+    """
+    st.fragment that also records each run as a `fragment_<name>` metrics span.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with metrics.span(f"fragment_{name}"):
+                return fn(*args, **kwargs)
+        return st.fragment(timed, **fragment_kwargs)
+    return decorate
+
+def current_image_prompt():
+    return st.session_state["last_optimized_prompt"] or st.session_state["last_prompt"]
+
+# --- STREAMED GENERATION ---
+def stream_prompt(user_prompt, refinement, language, subject, style, mood):
+    """
+    Render the completion while it streams, then store the final prompts in session state.
+    "Both" makes one structured call for all four variants instead of streaming.
+    Falls back to the offline prompt engine when offline mode is on or the API fails.
+    """
+    apply_output_tips = st.session_state["apply_output_tips"]
+    variants = {}
+    timing = {}
+    st.session_state["last_notice"] = None
+    if st.session_state["offline_mode"]:
+        if refinement == "🪄 Both":
+            variants = generate_offline_variants(subject, style, mood, apply_output_tips)
+        else:
+            raw, optimized = generate_offline_prompt(subject, style, mood, refinement, apply_output_tips), ""
+    else:
+        live = st.empty()
+        try:
+            with live.container():
+                if refinement == "🪄 Both":
+                    with st.spinner("✍️ Writing raw, optimized, MidJourney and Artisly.ai prompts..."):
+                        variants = generate_prompt_variants(user_prompt, timing=timing)
+                else:
+                    st.markdown("### ✍️ Writing your prompt...")
+                    raw = st.write_stream(generate_prompt_stream(user_prompt, refinement, timing, st.session_state.get("target_platform")))
+                    optimized = ""
+        except Exception as e:
+            # Shown by results_section: callers rerun right after this returns
+            st.session_state["last_notice"] = f"⚠️ Prompt API unavailable ({e}); used the offline prompt engine instead."
+            if refinement == "🪄 Both":
+                variants = generate_offline_variants(subject, style, mood, apply_output_tips)
+            else:
+                raw, optimized = generate_offline_prompt(subject, style, mood, refinement, apply_output_tips), ""
+        live.empty()
+
+    if variants:
+        raw, optimized = variants["raw"], variants["optimized"]
+    raw, optimized = (raw or "").strip(), (optimized or "").strip()
+    st.session_state["last_refinement"] = refinement
+    st.session_state["last_prompt"] = raw
+    st.session_state["last_optimized_prompt"] = optimized
+    history_store.add(user_id, raw)
+    st.session_state["last_timing"] = timing or None
+
+    if variants:
+        variants = localize_variants(variants, language)
+        st.session_state["last_prompt"], st.session_state["last_optimized_prompt"] = variants["raw"], variants["optimized"]
+    else:
+        st.session_state["last_prompt"], st.session_state["last_optimized_prompt"] = localize(raw, optimized, language)
+    st.session_state["last_variants"] = variants
+
 # --- USER INPUTS ---
+@section("inputs")
+def inputs_section():
+    # === THEME ===
+    theme_choice = st.selectbox(
+        "🖋️ Theme",
+        [CUSTOM_OPTION] + THEMES,
+        index=0,
+        placeholder="Pick or type a theme…"
+    )
+    if theme_choice == CUSTOM_OPTION:
+        theme_custom = st.text_input("Custom Theme")
+        theme = theme_custom.strip()
+    else:
+        theme = theme_choice
 
-# === THEME ===
-theme_choice = st.selectbox(
-    "🖋️ Theme",
-    [
-        "✏️ Type your own…",
-        # existing
-        "Elf Queen in an enchanted forest", "Cyberpunk city skyline at night", "Underwater steampunk laboratory",
-        "Haunted Victorian mansion", "Magical animal tea party", "Floating crystal island",
-        "Ancient jungle ruins", "Dreamy cloud kingdom", "Neon Tokyo alleyway", "Surreal clockwork garden",
-        "Galactic dragon shrine", "Rainy street café", "Mythical phoenix rebirth",
-        "Retro-futuristic arcade", "Whimsical flying train", "Alien carnival at dusk",
-        # added popular universes
-        "Marvel Universe", "DC Comics Universe", "Star Wars Galaxy", "Disney Fairytale Kingdom",
-        "Pixar Animated World", "Harry Potter Wizarding World", "Lord of the Rings Middle-earth",
-        "Game of Thrones Westeros", "Avatar: The Last Airbender World", "Pokemon Universe",
-        "Zelda: Hyrule", "Final Fantasy Realm", "Genshin Impact World", "My Hero Academia City"
-    ],
-    index=0,
-    placeholder="Pick or type a theme…"
-)
-if theme_choice == "✏️ Type your own…":
-    theme_custom = st.text_input("Custom Theme")
-    theme = theme_custom.strip()
-else:
-    theme = theme_choice
-
-# === STYLE ===
-style_choice = st.selectbox(
-    "🎨 Style",
-    [
-        "✏️ Type your own…",
-        "Watercolor", "Oil Painting", "Graffiti", "Sketch", "Pop Surrealism", "Lowbrow Art",
-        "Pixel Art", "Digital Matte Painting", "Studio Ghibli Style", "Ink & Wash", "Concept Art",
-        "3D Render", "Chalk Pastel", "Alcohol Ink", "Mosaic Art", "Origami Paper Style",
-        "Vaporwave", "Cyberpunk", "Art Nouveau", "Steampunk", "Tattoo Flash", "Woodcut Print",
-        "Dark Fantasy", "Line Art", "Cartoon",
-        # extra styles
-        "Solarpunk", "Dieselpunk", "Biopunk", "Baroque Engraving", "Ukiyo-e",
-        "Photobashing", "Cinematic Realism", "Isometric Diorama", "Liminal Space",
-        "Low-Poly 3D", "Cel-Shaded", "Pastelcore", "Noir Comic", "Pixel RPG UI",
-        # added realistic styles
-        "3D Realistic", "Photorealism",
-        # 🔥 Etsy-focused outputs
-        "Product Mockup (T-Shirt)", "Product Mockup (Mug)", "Product Mockup (Wall Art)",
-        "Sticker Pack (Die-Cut)", "Sticker (Kiss-Cut)", "Sticker (Holographic Look)",
-        "Clip Art Set (PNG Transparent)", "SVG Clip Art", "Printable Coloring Page",
-        "Seamless Pattern (Repeat Tile)", "Patterned Paper Pack"
-    ],
-    index=0,
-    placeholder="Pick or type a style…"
-)
-if style_choice == "✏️ Type your own…":
-    style_custom = st.text_input("Custom Style")
-    style = style_custom.strip()
-else:
-    style = style_choice
-
-# === Etsy tips feature ===
-apply_output_tips = st.checkbox(
-    "Auto-apply Etsy output tips",
-    value=True,
-    help="Adds practical print/seller notes to your prompt (transparent PNGs, bleed, mockups, etc.)."
-)
-
-def etsy_tips_for_style(style_name: str) -> str:
-    s = (style_name or "").lower()
-
-    if "sticker" in s:
-        return (
-            "Sticker production specs: crisp vector-like edges, high contrast, clean silhouette; "
-            "white offset stroke (2–4px) around subject; transparent background PNG (300 DPI); "
-            "die-cut friendly outline; avoid photo backgrounds."
-        )
+    # === STYLE ===
+    style_choice = st.selectbox(
+        "🎨 Style",
+        [CUSTOM_OPTION] + STYLES,
+        index=0,
+        placeholder="Pick or type a style…"
+    )
+    if style_choice == CUSTOM_OPTION:
+        style_custom = st.text_input("Custom Style")
+        style = style_custom.strip()
+    else:
+        style = style_choice
+
+    # === Etsy tips feature ===
+    apply_output_tips = st.checkbox(
+        "Auto-apply Etsy output tips",
+        value=True,
+        key="apply_output_tips",
+        help="Adds practical print/seller notes to your prompt (transparent PNGs, bleed, mockups, etc.)."
+    )
 
-    if "clip art" in s or "svg" in s:
-        return (
-            "Clip art set specs: simple shapes, flat fills, smooth paths; clean isolated subject "
-            "on transparent background (PNG 300 DPI) and SVG version; consistent palette and stroke weight."
-        )
+    # === MOOD ===
+    mood_choice = st.selectbox(
+        "✨ Mood",
+        [CUSTOM_OPTION] + MOODS,
+        index=0,
+        placeholder="Pick or type a mood…"
+    )
+    if mood_choice == CUSTOM_OPTION:
+        mood_custom = st.text_input("Custom Mood")
+        mood = mood_custom.strip()
+    else:
+        mood = mood_choice
 
-    if "mockup" in s:
-        if "t-shirt" in s or "shirt" in s:
-            return (
-                "Apparel mockup specs: front-view unisex crewneck on neutral studio background, "
-                "natural fabric folds, realistic lighting, true-to-size print area; high-res 3000px+."
-            )
-        if "mug" in s:
-            return (
-                "Mug mockup specs: 11oz ceramic mug 3/4 view on minimalist surface, soft shadows, "
-                "centered print area, high-res 3000px+."
-            )
-        if "wall art" in s or "poster" in s:
-            return (
-                "Wall art mockup specs: framed poster on clean wall, soft daylight, slight parallax, "
-                "room decor minimal, no glare; high-res 3000px+."
-            )
-        return (
-            "Product mockup specs: neutral studio scene, accurate proportions, soft realistic shadows, "
-            "no heavy branding; high-res 3000px+."
-        )
+    language = st.selectbox("🌍 Output Language", LANGUAGES)
 
-    if "pattern" in s or "seamless" in s or "paper pack" in s:
-        return (
-            "Pattern specs: perfectly seamless tile, edges match, repeatable motif, even spacing; "
-            "export square 2048–4096px tile; high contrast and clean edges."
-        )
+    refinement = st.radio("🧠 Smart Prompt Refinement", REFINEMENTS)
+    st.selectbox(
+        "🎯 Target platform",
+        [None, *PLATFORMS],
+        format_func=lambda platform: PLATFORMS.get(platform, "Any platform"),
+        key="target_platform",
+        help="Tailor single prompts for one generator. 🪄 Both always writes every variant."
+    )
 
-    if "photoreal" in s or "photorealism" in s or "3d realistic" in s:
-        return (
-            "Photoreal specs: lifelike materials, realistic lighting and shadows, subtle imperfections, "
-            "natural color balance; depth of field and accurate perspective."
-        )
+    st.toggle(
+        "⚡ Offline mode",
+        key="offline_mode",
+        help="Compose prompts instantly from the preset vocabularies without calling the API."
+    )
 
-    return ""
-
-# === MOOD ===
-mood_choice = st.selectbox(
-    "✨ Mood",
-    [
-        "✏️ Type your own…",
-        "Whimsical", "Mystical", "Ethereal", "Melancholic", "Dreamy", "Uplifting",
-        "Dark Fantasy", "Surreal", "Elegant", "Dramatic", "Romantic", "Peaceful",
-        "Intense", "Futuristic", "Retro", "Minimalist", "Cinematic", "Noir",
-        "Joyful", "Tranquil", "Spooky", "Playful", "Epic", "Spiritual", "Nostalgic",
-        # extra moods
-        "Cozy", "Hopeful", "Somber", "Euphoric", "Wholesome", "Gritty",
-        "Mysterious", "Whirlwind", "Melodic", "Sacred", "Otherworldly", "Zen",
-        "High-Energy", "Cold & Sterile", "Warm & Inviting"
-    ],
-    index=0,
-    placeholder="Pick or type a mood…"
-)
-if mood_choice == "✏️ Type your own…":
-    mood_custom = st.text_input("Custom Mood")
-    mood = mood_custom.strip()
-else:
-    mood = mood_choice
-
-language = st.selectbox("🌍 Output Language", [
-    "English", "Spanish", "French", "German", "Portuguese",
-    "Japanese", "Russian", "Chinese", "Korean", "Italian"
-])
-
-refinement = st.radio("🧠 Smart Prompt Refinement", [
-    "🔥 Raw creative prompt", "🎯 Optimized for AI clarity", "🪄 Both"
-])
-
-# --- EXPAND PROMPT ---
-st.markdown("### ✨ Expand a Short Idea into a Full Prompt")
-quick_idea = st.text_input("💡 Enter a short idea (e.g. magical forest cat)")
-if st.button("Expand Prompt"):
-    with st.spinner("Expanding..."):
-        tips = etsy_tips_for_style(style) if apply_output_tips else ""
-        base_prompt = f"{quick_idea}. Style: {style}. Mood: {mood}. {tips}".strip()
-        expanded = generate_prompt(base_prompt, refinement)
-        if refinement == "🪄 Both":
-            raw, optimized = expanded.split("###OPTIMIZED###")
-            st.session_state["last_prompt"] = raw.strip()
-            st.session_state["last_optimized_prompt"] = optimized.strip()
-            st.session_state["prompt_history"].append(raw.strip())
-        else:
-            st.session_state["last_prompt"] = expanded
-            st.session_state["last_optimized_prompt"] = ""
-            st.session_state["prompt_history"].append(expanded)
+    # --- EXPAND PROMPT ---
+    st.markdown("### ✨ Expand a Short Idea into a Full Prompt")
+    quick_idea = st.text_input("💡 Enter a short idea (e.g. magical forest cat)")
+    if st.button("Expand Prompt"):
+        base_prompt = compose_user_prompt(quick_idea, style, mood, apply_output_tips)
+        stream_prompt(base_prompt, refinement, language, quick_idea, style, mood)
+        st.rerun()
+
+    # --- GENERATE PROMPTS ---
+    if st.button("Generate Prompts"):
+        user_prompt = compose_user_prompt(theme, style, mood, apply_output_tips)
+        stream_prompt(user_prompt, refinement, language, theme, style, mood)
+        st.rerun()
+
+inputs_section()
+
+# --- BATCH GENERATE ---
+@section("batch")
+def batch_section():
+    apply_output_tips = st.session_state["apply_output_tips"]
+    with st.expander("📦 Batch Generate (Theme × Style × Mood grid)"):
+        batch_themes = st.multiselect("Themes", THEMES, key="batch_themes")
+        batch_styles = st.multiselect("Styles", STYLES, key="batch_styles")
+        batch_moods = st.multiselect("Moods", MOODS, key="batch_moods")
+        batch_refinements = st.multiselect("Refinements", REFINEMENTS, default=[REFINEMENTS[0]], key="batch_refinements")
+        batch_languages = st.multiselect("Languages", LANGUAGES, default=["English"], key="batch_languages")
+        batch_concurrency = st.slider("Parallel requests", 1, 32, 8, key="batch_concurrency")
+
+        batch_items = build_grid(batch_themes, batch_styles, batch_moods, batch_refinements, batch_languages)
+        st.caption(f"{len(batch_items)} prompt(s) in this grid")
+
+        batch_offline = st.checkbox("Offline (no API calls, English only)", value=st.session_state["offline_mode"], key="batch_offline")
+
+        if st.button("🚀 Run Batch", disabled=not batch_items):
+            if batch_offline:
+                st.session_state["batch_results"] = generate_for_items(batch_items, apply_output_tips)
+            else:
+                progress = st.progress(0.0, text="Starting batch...")
 
-        if language != "English":
-            st.session_state["last_prompt"] = translate_prompt(st.session_state["last_prompt"], language)
-            if st.session_state["last_optimized_prompt"]:
-                st.session_state["last_optimized_prompt"] = translate_prompt(st.session_state["last_optimized_prompt"], language)
+                def _on_result(result, done, total):
+                    progress.progress(done / total, text=f"{done}/{total} prompts generated")
 
-# --- GENERATE PROMPTS ---
-if st.button("Generate Prompts"):
-    with st.spinner("Generating prompts..."):
-        tips = etsy_tips_for_style(style) if apply_output_tips else ""
-        user_prompt = f"{theme}. Style: {style}. Mood: {mood}. {tips}".strip()
-        prompt = generate_prompt(user_prompt, refinement)
+                st.session_state["batch_results"] = run_batch(
+                    batch_items,
+                    on_result=_on_result,
+                    concurrency=batch_concurrency,
+                    apply_tips=apply_output_tips,
+                    platform=st.session_state.get("target_platform"),
+                )
 
-        st.session_state["last_refinement"] = refinement
+        batch_results = st.session_state.get("batch_results")
+        if batch_results:
+            failed = sum(1 for r in batch_results if r["error"])
+            st.success(f"✅ {len(batch_results) - failed} prompts generated, {failed} failed.")
+            st.dataframe(batch_results, use_container_width=True)
 
-        if refinement == "🪄 Both":
-            raw, optimized = prompt.split("###OPTIMIZED###")
-            st.session_state["last_prompt"] = raw.strip()
-            st.session_state["last_optimized_prompt"] = optimized.strip()
-            st.session_state["prompt_history"].append(raw.strip())
-        else:
-            st.session_state["last_prompt"] = prompt
-            st.session_state["last_optimized_prompt"] = ""
-            st.session_state["prompt_history"].append(prompt)
+            jsonl = "\n".join(json.dumps(r, ensure_ascii=False) for r in batch_results)
+            st.download_button("⬇️ Download JSONL", jsonl, file_name="batch_prompts.jsonl")
+
+            st.download_button("⬇️ Download CSV", exports.build_csv(batch_results), file_name="batch_prompts.csv")
 
-        if language != "English":
-            st.session_state["last_prompt"] = translate_prompt(st.session_state["last_prompt"], language)
-            if st.session_state["last_optimized_prompt"]:
-                st.session_state["last_optimized_prompt"] = translate_prompt(st.session_state["last_optimized_prompt"], language)
+            if st.button("🗜️ Build listing pack (TXT + PDF per prompt)"):
+                with st.spinner("Bundling..."), BundleWriter() as pack:
+                    for _ in bundle_results(batch_results, pack):
+                        pass
+                    st.download_button("⬇️ Download listing pack", pack.close(), file_name="listing_pack.zip")
+
+batch_section()
 
 # --- DISPLAY PROMPTS ---
-if st.session_state["last_prompt"]:
+@section("results")
+def results_section():
     r = st.session_state["last_refinement"]
     st.success("✅ Prompts Generated!")
+    if st.session_state["last_notice"]:
+        st.warning(st.session_state["last_notice"])
 
     if r == "🔥 Raw creative prompt":
         st.markdown("### 1. **MidJourney Prompt:**")
@@ -313,96 +382,203 @@ if st.session_state["last_prompt"]:
         st.markdown(f"> {st.session_state['last_prompt']}")
         st.markdown("### 2. **Artisly.ai Prompt (Optimized):**")
         st.markdown(f"> {st.session_state['last_prompt']}")
+    elif st.session_state["last_variants"]:
+        variants = st.session_state["last_variants"]
+        st.markdown("### 1. **MidJourney Prompt:**")
+        st.markdown(f"> {variants['midjourney']}")
+        st.markdown("### 2. **Artisly.ai Prompt:**")
+        st.markdown(f"> {variants['artisly']}")
+        with st.expander("🔥 Raw & 🎯 optimized versions"):
+            st.markdown(f"**Raw:** {st.session_state['last_prompt']}")
+            st.markdown(f"**Optimized:** {st.session_state['last_optimized_prompt']}")
     else:
         st.markdown("### 1. **MidJourney Prompt (Raw):**")
         st.markdown(f"> {st.session_state['last_prompt']}")
         st.markdown("### 2. **Artisly.ai Prompt (Optimized):**")
         st.markdown(f"> {st.session_state['last_optimized_prompt']}")
 
-    # --- DOWNLOAD OPTIONS ---
-    txt = f"MidJourney: {st.session_state['last_prompt']}\n\nArtisly.ai: {st.session_state['last_optimized_prompt'] or st.session_state['last_prompt']}"
+    timing = st.session_state.get("last_timing")
+    if timing:
+        source = "cache" if timing["cached"] else timing["model"]
+        queued = f" · queued {timing['queued']:.2f}s" if timing.get("queued") else ""
+        st.caption(f"⏱️ First token in {timing['ttft']:.2f}s · total {timing['total']:.2f}s ({source}){queued}")
+
+# --- DOWNLOAD OPTIONS ---
+@section("exports")
+def exports_section():
+    txt = exports.build_txt(
+        st.session_state["last_prompt"], st.session_state["last_optimized_prompt"], st.session_state["last_variants"]
+    )
     st.download_button("📄 Download as TXT", txt, file_name="prompt.txt")
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer)
-    styles = getSampleStyleSheet()
-    story = [Paragraph(txt.replace('\n', '<br/>'), styles['Normal'])]
-    doc.build(story)
-    st.download_button("📝 Download as PDF", buffer.getvalue(), file_name="prompt.pdf")
+    image_paths = [v["path"] for v in image_store.get_variants(current_image_prompt())]
+
+    # PDF and ZIP are only built once requested, then memoized by content
+    if exports.is_built("zip", txt, *image_paths) or st.button("📦 Prepare PDF & ZIP"):
+        st.download_button("📝 Download as PDF", exports.build_pdf(txt), file_name="prompt.pdf")
+        with open(exports.build_zip(txt, image_paths), "rb") as bundle_file:
+            st.download_button("🗜️ Download ZIP", bundle_file, file_name="prompt_bundle.zip")
 
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w") as zipf:
-        zipf.writestr("prompt.txt", txt)
-        zipf.writestr("prompt.pdf", buffer.getvalue())
-    st.download_button("🗜️ Download ZIP", zip_buffer.getvalue(), file_name="prompt_bundle.zip")
+# --- DALL·E IMAGE GENERATION ---
+@section("images")
+def images_section():
+    dalle_prompt = current_image_prompt()
+    image_variants = image_store.get_variants(dalle_prompt)
 
-    # --- DALL·E IMAGE GENERATION ---
+    variant_count = st.slider("Image variants", 1, image_store.MAX_VARIANTS, 1)
     if st.button("🖼️ Generate Etsy Image (DALLE 3)"):
-        with st.spinner("Generating image..."):
-            dalle_prompt = st.session_state['last_optimized_prompt'] or st.session_state['last_prompt']
-            image_url = generate_dalle_image(dalle_prompt)
-            if image_url:
-                st.image(image_url, caption="DALL·E 3 Preview")
-            else:
-                st.error("Failed to generate image.")
-
-    # --- PROMPT HISTORY ---
-    if st.session_state["prompt_history"]:
-        st.markdown("### 🔁 Prompt History")
-        for i, p in enumerate(reversed(st.session_state["prompt_history"][-10:]), 1):
-            st.markdown(f"**{i}.** {p}")
-            if st.button(f"❤️ Favorite #{i}", key=f"fav_{i}"):
-                st.session_state["favorite_prompts"].append(p)
-                st.success("Added to favorites!")
-
-   # --- IMAGE TO PROMPT (Vision AI for OpenAI v1.x) ---
-st.markdown("## 🖼️ Generate Prompt from Image")
-
-uploaded_file = st.file_uploader("Upload an image (JPG or PNG)", type=["jpg", "jpeg", "png"])
-
-if uploaded_file:
-    st.image(uploaded_file, caption="Uploaded Image", use_container_width=True)
-
-    if st.button("🔍 Analyze Image and Generate Prompt"):
-        with st.spinner("Analyzing image and generating prompt..."):
-            try:
-                image_bytes = uploaded_file.read()
-
-                response = openai.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a professional artist assistant. Analyze the uploaded image and describe it as a highly imaginative AI art prompt."
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": "Generate an AI art prompt based on this image."},
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode()}"
-                                    }
-                                }
-                            ]
-                        }
-                    ],
-                    max_tokens=500,
-                )
+        # Runs in the background; previews show up here once the job finishes
+        st.session_state["job_ids"].append(
+            jobs.submit("dalle", dalle_prompt, image_store.generate_variants, dalle_prompt, variant_count)
+        )
+        st.toast("🖼️ Image queued — keep working while it renders.")
+        # Full rerun so the jobs panel starts polling
+        st.rerun()
+
+    if image_variants:
+        columns = st.columns(len(image_variants))
+        for i, (column, variant) in enumerate(zip(columns, image_variants), 1):
+            with column:
+                st.image(variant["thumbnail"], caption=f"DALL·E 3 Preview #{i}")
+                with open(variant["path"], "rb") as f:
+                    st.download_button(f"⬇️ Full size #{i}", f, file_name=f"preview_{i}.png", key=f"image_{i}")
+
+# --- PROMPT HISTORY ---
+def set_history_page(page):
+    st.session_state["history_page"] = page
+
+@section("history")
+def history_section():
+    st.markdown("### 🔁 Prompt History")
+    history_query = st.text_input("🔎 Search past prompts and favorites", key="history_query")
+    if history_query:
+        history_rows = history_store.search(user_id, history_query)
+        if not history_rows:
+            st.caption("No matching prompts.")
+    else:
+        page = st.session_state.get("history_page", 0)
+        history_rows, history_total = history_store.page(user_id, HISTORY, page, HISTORY_PAGE_SIZE)
+        last_page = max(0, (history_total - 1) // HISTORY_PAGE_SIZE)
+        prev_col, info_col, next_col = st.columns([1, 2, 1])
+        # Callbacks run before the fragment reruns, so the new page renders right away
+        prev_col.button("⬅️ Newer", disabled=page == 0, on_click=set_history_page, args=(page - 1,))
+        info_col.caption(f"Page {page + 1} of {last_page + 1} · {history_total} prompts")
+        next_col.button("Older ➡️", disabled=page >= last_page, on_click=set_history_page, args=(page + 1,))
+
+    for row in history_rows:
+        st.markdown(f"**{'❤️' if row.get('kind') == FAVORITE else '•'}** {row['text']}")
+        if row.get("kind") != FAVORITE and st.button("❤️ Favorite", key=f"fav_{row['id']}"):
+            history_store.add(user_id, row["text"], FAVORITE)
+            st.success("Added to favorites!")
+
+    favorites, favorites_total = history_store.page(user_id, FAVORITE, 0, HISTORY_PAGE_SIZE)
+    if favorites:
+        with st.expander(f"❤️ Favorites ({favorites_total})"):
+            for row in favorites:
+                st.markdown(f"- {row['text']}")
 
-                image_prompt = response.choices[0].message.content.strip()
-                st.session_state["last_prompt"] = image_prompt
-                st.session_state["last_optimized_prompt"] = ""
-                st.session_state["last_refinement"] = "🔥 Raw creative prompt"
-                st.session_state["prompt_history"].append(image_prompt)
+if st.session_state["last_prompt"]:
+    results_section()
+    exports_section()
+    images_section()
+    history_section()
+
+# --- IMAGE TO PROMPT (Vision AI for OpenAI v1.x) ---
+@section("image_to_prompt")
+def image_to_prompt_section():
+    st.markdown("## 🖼️ Generate Prompt from Image")
+
+    uploaded_file = st.file_uploader("Upload an image (JPG or PNG)", type=["jpg", "jpeg", "png"])
+
+    if uploaded_file:
+        st.image(uploaded_file, caption="Uploaded Image", use_container_width=True)
+
+        if st.button("🔍 Analyze Image and Generate Prompt"):
+            st.session_state["job_ids"].append(
+                jobs.submit("vision", uploaded_file.name, analyze_uploaded_image, uploaded_file.getvalue())
+            )
+            st.toast("🔍 Image analysis queued — keep working while it runs.")
+            # Full rerun so the jobs panel starts polling
+            st.rerun()
+
+image_to_prompt_section()
+
+# --- BACKGROUND JOBS ---
+def render_job(job):
+    st.markdown(
+        f"{JOB_ICONS[job.status]} **{JOB_TITLES[job.kind]}** · {job.label[:60]} · "
+        f"{job.status} · {job.elapsed():.0f}s"
+    )
+    if job.status == FAILED:
+        st.caption(f"Failed: {job.error}")
+    elif job.status == DONE and job.kind == "dalle":
+        if job.result:
+            st.image([variant["thumbnail"] for variant in job.result], width=120)
+        else:
+            st.caption("Failed to generate image.")
+    elif job.status == DONE and job.kind == "vision":
+        image_prompt, report = job.result
+        st.markdown(f"> {image_prompt}")
+        if report["cached"]:
+            st.caption("♻️ Same image analyzed before — reused the saved prompt, no upload or tokens spent.")
+        else:
+            st.caption(
+                f"📉 Sent {report['sent_bytes'] / 1024:.0f} KB instead of {report['original_bytes'] / 1024:.0f} KB "
+                f"({report['bytes_saved'] / 1024:.0f} KB saved) · "
+                f"~{report['sent_tokens']} image tokens instead of ~{report['original_tokens']}"
+            )
+
+session_jobs = jobs.get_many(st.session_state["job_ids"])
+jobs_pending = any(job.pending for job in session_jobs)
+
+# Polls only while something is running; a finished job triggers one full rerun
+# so its result reaches the prompt display and image previews above
+@section("jobs", run_every=JOB_POLL_SECONDS if jobs_pending else None)
+def jobs_panel():
+    session_jobs = jobs.get_many(st.session_state["job_ids"])
+    if any(not job.pending and job.id not in st.session_state["jobs_applied"] for job in session_jobs):
+        st.rerun()
+    if not session_jobs:
+        return
+    st.markdown("### ⏳ Background jobs")
+    for job in reversed(session_jobs[-10:]):
+        render_job(job)
+
+jobs_panel()
+
+# --- API QUEUE ---
+with st.sidebar:
+    queue = scheduler.stats()
+    st.markdown("### 🚦 API queue")
+    st.caption(
+        f"{queue['queued']} waiting ({queue['interactive_queued']} interactive · {queue['bulk_queued']} bulk) · "
+        f"avg wait {queue['interactive_avg_wait_s']:.2f}s interactive / {queue['bulk_avg_wait_s']:.2f}s bulk"
+    )
+    for model, lane in queue["models"].items():
+        st.caption(
+            f"{model or 'default'} headroom: {lane['rpm_available']} requests · {lane['tpm_available']} tokens this minute"
+            + (f" · ⏸️ rate-limited, resuming in {lane['paused_s']:.0f}s" if lane["paused_s"] else "")
+        )
+    routes = router.stats()
+    p95s = " · ".join(f"{model} p95 {p95:.1f}s" for model, p95 in routes["p95_s"].items() if p95 is not None)
+    st.caption(
+        f"Routing: {routes['policy']} policy · {routes['failovers']} failovers · {routes['truncations']} truncation retries"
+        + (f" · {p95s}" if p95s else "")
+    )
 
-                st.success("🖼️ Prompt Generated from Image!")
-                st.markdown("### **Prompt:**")
-                st.markdown(f"> {image_prompt}")
+# --- DEBUG METRICS ---
+with st.sidebar:
+    if st.toggle("🐞 Debug metrics", key="debug_metrics"):
+        st.markdown("### ⏱️ Stage timings")
+        st.dataframe(metrics.summary(), use_container_width=True, hide_index=True)
+        st.markdown("### 🧾 Recent spans")
+        st.dataframe(list(metrics.recent)[-20:][::-1], use_container_width=True, hide_index=True)
+        st.download_button("⬇️ Spans (JSONL)", metrics.to_jsonl(), file_name="metrics.jsonl")
+        st.download_button("⬇️ Prometheus text", metrics.to_prometheus(), file_name="metrics.prom")
+        if st.button("♻️ Reset metrics"):
+            metrics.reset()
+            st.rerun()
 
-            except Exception as e:
-                st.error(f"Image analysis failed: {str(e)}")
 # Custom footer (centered with white background)
 footer = """
     <style>
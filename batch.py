@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import random
+import time
+
+from bot import chat_messages, generate_prompt_variants, system_message
+from cache import prompt_cache
+from clients import new_async_openai_client
+from metrics import metrics, record_usage
+from presets import compose_user_prompt
+from routing import router, TRUNCATION_RETRIES
+from scheduler import BULK, estimate_tokens, scheduler
+from translate import translate_prompts
+from transport import retry_after_seconds
+
+def _retryable_errors():
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
+
+
+def build_grid(themes, styles, moods, refinements, languages):
+    """
+    Expand Theme × Style × Mood × Refinement × Language into a list of batch items.
+    """
+    return [
+        {"theme": t, "style": s, "mood": m, "refinement": r, "language": lang}
+        for t, s, m, r, lang in itertools.product(themes, styles, moods, refinements, languages)
+    ]
+
+
+async def _create(client, messages, route, span, retries, base_delay):
+    import openai
+
+    reserved = estimate_tokens(messages, route["max_tokens"])
+    retryable = _retryable_errors()
+    for attempt in range(retries + 1):
+        # Batch work queues behind interactive clicks in the shared scheduler
+        span["queued_s"] = span.get("queued_s", 0.0) + await asyncio.to_thread(scheduler.acquire, reserved, BULK, route["model"])
+        try:
+            started = time.perf_counter()
+            response = await client.chat.completions.create(
+                model=route["model"],
+                messages=messages,
+                max_tokens=route["max_tokens"]
+            )
+            router.observe(route["model"], time.perf_counter() - started)
+            break
+        except retryable as e:
+            if attempt == retries:
+                raise
+            span["retries"] = attempt + 1
+            if isinstance(e, openai.RateLimitError):
+                scheduler.backoff(retry_after_seconds(e.response, attempt), route["model"])
+            else:
+                await asyncio.sleep(base_delay * (2 ** attempt) + random.uniform(0, base_delay))
+    record_usage(span, response.usage)
+    scheduler.settle(reserved, getattr(response.usage, "total_tokens", None), route["model"])
+    return response
+
+
+async def _complete(client, user_prompt, refinement, retries, base_delay, platform=None):
+    system_msg = system_message(refinement, platform)
+    route = router.route(refinement, user_prompt, platform)
+    cache_key = prompt_cache.key(route["model"], system_msg, user_prompt, route["max_tokens"], refinement)
+    with metrics.span("generate_prompt", model=route["model"], refinement=refinement, rule=route["rule"], batch=True) as span:
+        if route["failover_from"]:
+            span["failover_from"] = route["failover_from"]
+        cached = prompt_cache.get(cache_key)
+        if cached is not None:
+            span["cached"] = True
+            return cached
+
+        messages = chat_messages(system_msg, user_prompt)
+        current = route
+        for attempt in range(TRUNCATION_RETRIES + 1):
+            choice = (await _create(client, messages, current, span, retries, base_delay)).choices[0]
+            if choice.finish_reason != "length":
+                break
+            # Cut off at max_tokens: ask again with a bigger budget
+            span["truncated"] = attempt + 1
+            current = router.after_truncation(current)
+            if current is None:
+                break
+
+    content = choice.message.content
+    if choice.finish_reason != "length":
+        prompt_cache.set(cache_key, content)
+    return content
+
+
+async def _generate_one(client, semaphore, index, item, apply_tips, retries, base_delay, platform):
+    result = dict(item, index=index, prompt="", optimized_prompt="", midjourney_prompt="", artisly_prompt="", error=None)
+    user_prompt = compose_user_prompt(item["theme"], item["style"], item["mood"], apply_tips)
+    try:
+        async with semaphore:
+            if item["refinement"] == "🪄 Both":
+                # One structured call for all four variants, on the shared sync client
+                variants = await asyncio.to_thread(generate_prompt_variants, user_prompt, BULK)
+                texts = [variants["raw"], variants["optimized"], variants["midjourney"], variants["artisly"]]
+            else:
+                text = await _complete(client, user_prompt, item["refinement"], retries, base_delay, item.get("platform") or platform)
+                texts = [text, "", "", ""]
+
+        language = item.get("language", "English")
+        if language != "English":
+            texts = await asyncio.to_thread(translate_prompts, texts, language)
+
+        result["prompt"], result["optimized_prompt"], result["midjourney_prompt"], result["artisly_prompt"] = texts
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+async def generate_prompts_batch(items, concurrency=8, retries=3, base_delay=1.0, apply_tips=True, platform=None, client=None):
+    """
+    Generate prompts for many (theme, style, mood, refinement, language) items at once.
+    `platform` targets one generator for every item without its own "platform".
+
+    At most `concurrency` completions are in flight; transient API errors are retried
+    with exponential backoff. Results are yielded as they complete, tagged with the
+    index of the item that produced them.
+    """
+    owns_client = client is None
+    if owns_client:
+        client = new_async_openai_client(max_retries=0)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(_generate_one(client, semaphore, i, item, apply_tips, retries, base_delay, platform))
+        for i, item in enumerate(items)
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        if owns_client:
+            # Release the run's httpx connection pool; a passed-in client is the caller's
+            await client.close()
+
+
+def run_batch(items, on_result=None, **kwargs):
+    """
+    Blocking wrapper around generate_prompts_batch for the Streamlit script thread.
+    """
+    async def _collect():
+        results = []
+        async for result in generate_prompts_batch(items, **kwargs):
+            results.append(result)
+            if on_result:
+                on_result(result, len(results), len(items))
+        return sorted(results, key=lambda r: r["index"])
+
+    return asyncio.run(_collect())
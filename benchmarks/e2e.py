@@ -0,0 +1,149 @@
+"""
+End-to-end latency benchmark against the local stub server.
+
+Drives the real bot.generate_prompt, translate.translate_prompt and
+dalle_generator.generate_dalle_image code paths, then clicks "Generate Prompts"
+in app.py through streamlit.testing.v1.AppTest from N concurrent simulated
+sessions. Reports p50/p95/p99 latency, network calls per click and rerun cost.
+
+Run from the repo root:  python benchmarks/e2e.py --sessions 4 --clicks 5 --latency 0.3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stub_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else float("nan")
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(name, samples, extra=""):
+    p50, p95, p99 = percentiles(samples)
+    print(f"  {name:<24} n={len(samples):<5} p50 {p50 * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms  p99 {p99 * 1000:8.1f} ms  {extra}")
+
+
+def timed_concurrently(fn, count, workers):
+    def _one(i):
+        started = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_one, range(count)))
+
+
+def bench_code_paths(args, config):
+    import bot
+    import dalle_generator
+    import translate
+
+    print("Code paths (unique inputs, so every call misses the caches)")
+    run = f"{time.time():.0f}"
+    cases = [
+        ("bot.generate_prompt", "chat", lambda i: bot.generate_prompt(f"Elf queen #{run}-{i}. Style: Watercolor.", "🔥 Raw creative prompt")),
+        ("translate.translate_prompt", "translate", lambda i: translate.translate_prompt(f"Magical forest cat #{run}-{i}", "Spanish")),
+        ("generate_dalle_image", "images", lambda i: dalle_generator.generate_dalle_image(f"Neon Tokyo #{run}-{i}")),
+    ]
+    for name, endpoint, fn in cases:
+        config.reset()
+        samples = timed_concurrently(fn, args.calls, args.sessions)
+        calls = config.snapshot().get(endpoint, 0)
+        report(name, samples, f"{calls / len(samples):.2f} {endpoint} calls/op")
+
+
+def _session(args, session_index):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.secrets["OPENAI_API_KEY"] = "sk-benchmark"
+    at.run()
+    next(s for s in at.selectbox if s.label == "🌍 Output Language").select(args.language)
+    at.run()
+
+    clicks, reruns = [], []
+    for click in range(args.clicks):
+        theme = next(t for t in at.text_input if t.label == "Custom Theme")
+        theme.input(f"Session {session_index} idea {click} at {time.time()}")
+        button = next(b for b in at.button if b.label == "Generate Prompts")
+        started = time.perf_counter()
+        button.click().run()
+        clicks.append(time.perf_counter() - started)
+        if at.exception:
+            raise RuntimeError(at.exception)
+
+        # A rerun triggered by an unrelated widget, with a prompt on screen
+        started = time.perf_counter()
+        at.run()
+        reruns.append(time.perf_counter() - started)
+    return clicks, reruns
+
+
+def bench_app(args, config):
+    print(f"\napp.py 'Generate Prompts' clicks ({args.sessions} concurrent sessions × {args.clicks} clicks, language={args.language})")
+    config.reset()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = list(pool.map(lambda i: _session(args, i), range(args.sessions)))
+    clicks = [t for session_clicks, _ in results for t in session_clicks]
+    reruns = [t for _, session_reruns in results for t in session_reruns]
+    calls = config.snapshot()
+    per_click = ", ".join(
+        f"{endpoint} {count / len(clicks):.2f}" for endpoint, count in sorted(calls.items()) if ":" not in endpoint
+    )
+    report("click → prompt shown", clicks)
+    report("idle rerun", reruns)
+    print(f"  network calls per click: {per_click or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument("--clicks", type=int, default=5, help="clicks per session")
+    parser.add_argument("--calls", type=int, default=40, help="calls per code path")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.005, help="delay between streamed tokens (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--language", default="Spanish")
+    parser.add_argument("--skip-app", action="store_true", help="only benchmark the code paths")
+    args = parser.parse_args()
+
+    server, config, base_url = stub_server.start(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, token_latency=args.token_latency
+    )
+    scratch = tempfile.mkdtemp(prefix="artistic-bench-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "TRANSLATE_BASE_URL": f"{base_url}/translate",
+        "PROMPT_CACHE_PATH": os.path.join(scratch, "prompt_cache.sqlite3"),
+        "PROMPT_HISTORY_PATH": os.path.join(scratch, "prompt_history.sqlite3"),
+        "IMAGE_STORE_DIR": os.path.join(scratch, "images"),
+        # Benchmark prompts differ only by a counter; measure real calls, not near-duplicate hits
+        "SEMANTIC_CACHE": "0",
+    })
+    sys.path.insert(0, ROOT)
+    print(f"Stub at {base_url} · latency {args.latency}s · error rate {args.error_rate:.0%} · scratch {scratch}\n")
+
+    try:
+        bench_code_paths(args, config)
+        if not args.skip_app:
+            bench_app(args, config)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
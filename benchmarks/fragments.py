@@ -0,0 +1,101 @@
+"""
+Per-interaction server time: full-script rerun vs. fragment rerun.
+
+Loads app.py in streamlit.testing.v1.AppTest against the local stub server,
+generates a prompt so every section is on the page, then performs each
+interaction N times. AppTest always reruns the whole script, which is what
+every interaction cost before app.py was split into st.fragment sections; the
+`fragment_<name>` metrics span recorded in the same run is what the owning
+fragment alone costs now that only it reruns.
+
+Run from the repo root:  python benchmarks/fragments.py --repeat 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import stub_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def _prepare_exports(at, i):
+    import exports
+
+    # Drop the bundle built by the previous repeat so the button shows again
+    exports.clear()
+    at.run()
+    _button(at, "📦 Prepare PDF & ZIP").click()
+
+
+# (description, fragment that owns the widget, action)
+INTERACTIONS = [
+    ("Change theme selectbox", "inputs", lambda at, i: at.selectbox[0].select_index(1 + i % 5)),
+    ("Favorite a history row", "history", lambda at, i: next(b for b in at.button if b.label == "❤️ Favorite").click()),
+    ("Page history", "history", lambda at, i: _button(at, "Older ➡️" if i % 2 == 0 else "⬅️ Newer").click()),
+    ("Move image variant slider", "images", lambda at, i: next(s for s in at.slider if s.label == "Image variants").set_value(1 + i % 2)),
+    ("Pick batch themes", "batch", lambda at, i: at.multiselect(key="batch_themes").set_value([] if i % 2 else ["Rainy street café"])),
+    ("Prepare PDF & ZIP", "exports", _prepare_exports),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="runs per interaction")
+    args = parser.parse_args()
+
+    server, _, base_url = stub_server.start(latency=0.05, jitter=0.0, token_latency=0.0)
+    scratch = tempfile.mkdtemp(prefix="artistic-bench-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "TRANSLATE_BASE_URL": f"{base_url}/translate",
+        "PROMPT_CACHE_PATH": os.path.join(scratch, "prompt_cache.sqlite3"),
+        "PROMPT_HISTORY_PATH": os.path.join(scratch, "prompt_history.sqlite3"),
+        "IMAGE_STORE_DIR": os.path.join(scratch, "images"),
+    })
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+    from history_store import HISTORY, history_store
+    from metrics import metrics
+
+    # Enough history for several pages and plenty of rows to favorite, for
+    # the user AppTest signs in as
+    for i in range(40):
+        history_store.add("test@example.com", f"Seeded prompt #{i}: a lantern-lit harbor at dusk", HISTORY)
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.secrets["OPENAI_API_KEY"] = "sk-benchmark"
+    at.run()
+    _button(at, "Generate Prompts").click().run()
+    assert not at.exception, at.exception
+
+    print(f"{'interaction':<28} {'full rerun':>12} {'fragment only':>15} {'reduction':>10}")
+    try:
+        for description, fragment, action in INTERACTIONS:
+            full, partial = [], []
+            for i in range(args.repeat):
+                action(at, i)
+                started = time.perf_counter()
+                at.run()
+                full.append(time.perf_counter() - started)
+                assert not at.exception, at.exception
+                spans = [s for s in metrics.recent if s["stage"] == f"fragment_{fragment}"]
+                partial.append(spans[-1]["duration"])
+            full_ms = statistics.median(full) * 1000
+            partial_ms = statistics.median(partial) * 1000
+            print(f"{description:<28} {full_ms:9.1f} ms {partial_ms:12.1f} ms {1 - partial_ms / full_ms:9.0%}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Model routing benchmark: latency and token spend per routing policy.
+
+Runs the same mixed workload (bare short ideas and composed prompts with style
+tips, across every refinement and target platform) through
+bot.generate_prompt / generate_prompt_variants once per policy in
+routing.POLICIES, against the local stub server with a slow gpt-4, a medium
+gpt-4o and a fast gpt-4o-mini. Stub completions are --completion-words long,
+cut at max_tokens.
+
+Two more scenarios: gpt-4 degraded past the p95 budget, showing the "quality"
+policy failing over to the next model; and completions longer than the
+default budgets, showing truncated answers retried with a bigger one.
+
+Run from the repo root:  python benchmarks/routing.py --calls 40 --workers 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stub_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (latency s, s per generated token); relative speeds, scaled down
+MODEL_SPEEDS = {
+    "gpt-4": (0.6, 0.004),
+    "gpt-4o": (0.3, 0.0015),
+    "gpt-4o-mini": (0.15, 0.0008),
+}
+SHORT_IDEAS = ["a lighthouse keeper's cat", "neon koi pond", "tiny dragon librarian", "desert rain", "clockwork garden"]
+
+
+def workload(count, seed=0):
+    """
+    [(refinement, user_prompt, platform)], unique per call so nothing is served from cache.
+    """
+    from presets import MOODS, PLATFORMS, REFINEMENTS, STYLES, THEMES, compose_user_prompt, etsy_tips_for_style
+
+    # Styles that come with Etsy output tips make the long-input half
+    tipped = [s for s in STYLES if etsy_tips_for_style(s)]
+    rng = random.Random(seed)
+    run = f"{time.time():.0f}"
+    platforms = [None, *PLATFORMS]
+    items = []
+    for i in range(count):
+        refinement = REFINEMENTS[i % len(REFINEMENTS)]
+        platform = platforms[i // len(REFINEMENTS) % len(platforms)]
+        if i % 2 == 0:
+            subject = f"{rng.choice(SHORT_IDEAS)} #{run}-{i}"
+            prompt = compose_user_prompt(subject, rng.choice(STYLES), rng.choice(MOODS), apply_tips=False)
+        else:
+            subject = f"{rng.choice(THEMES)} #{run}-{i}"
+            prompt = compose_user_prompt(subject, rng.choice(tipped), rng.choice(MOODS), apply_tips=True)
+        items.append((refinement, prompt, platform))
+    return items
+
+
+def _call(item):
+    import bot
+
+    refinement, user_prompt, platform = item
+    started = time.perf_counter()
+    if refinement == "🪄 Both":
+        bot.generate_prompt_variants(user_prompt)
+    else:
+        bot.generate_prompt(user_prompt, refinement, platform=platform)
+    return time.perf_counter() - started
+
+
+def run_policy(name, items, workers, config):
+    from metrics import metrics
+    from routing import router
+
+    router.policy = name
+    router.reset()
+    metrics.reset()
+    config.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = list(pool.map(_call, items))
+    wall = time.perf_counter() - started
+
+    completion = sum(r["completion_tokens"] for r in metrics.summary())
+    mix = {k.split(":", 1)[1]: v for k, v in config.snapshot().items() if k.startswith("chat:")}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "wall": wall,
+        "completion_tokens": completion,
+        "mix": " ".join(f"{m}×{c}" for m, c in sorted(mix.items())),
+        "failovers": router.failovers,
+        "truncations": router.truncations,
+    }
+
+
+def print_row(name, row):
+    print(
+        f"  {name:<10} p50 {row['p50'] * 1000:7.0f} ms  p95 {row['p95'] * 1000:7.0f} ms  "
+        f"wall {row['wall']:5.1f} s  completion tokens {row['completion_tokens']:6d}  "
+        f"failovers {row['failovers']:<3} truncations {row['truncations']:<3} {row['mix']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40, help="calls per policy")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent callers")
+    parser.add_argument("--degraded-latency", type=float, default=2.5, help="gpt-4 latency in the failover scenario (s)")
+    parser.add_argument("--budget", type=float, default=2.0, help="p95 budget in the failover scenario (s)")
+    parser.add_argument("--completion-words", type=int, default=120, help="length of a stub completion")
+    parser.add_argument("--long-words", type=int, default=300, help="completion length in the truncation scenario")
+    args = parser.parse_args()
+
+    def completion(words):
+        return " ".join((stub_server.COMPLETION_TEXT.split() * (words // 20 + 1))[:words])
+
+    server, config, base_url = stub_server.start(
+        latency=0.3, jitter=0.02, token_latency=0.0015, completion_text=completion(args.completion_words), generation_time=True
+    )
+    for model, (latency, token_latency) in MODEL_SPEEDS.items():
+        config.models[model] = {"latency": latency, "token_latency": token_latency}
+    scratch = tempfile.mkdtemp(prefix="artistic-bench-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "PROMPT_CACHE_PATH": os.path.join(scratch, "prompt_cache.sqlite3"),
+        "PROMPT_HISTORY_PATH": os.path.join(scratch, "prompt_history.sqlite3"),
+        "IMAGE_STORE_DIR": os.path.join(scratch, "images"),
+        "SEMANTIC_CACHE": "0",
+        # Measure model time, not the shared rate limiter
+        "OPENAI_TPM_LIMIT": "10000000",
+        "OPENAI_RPM_LIMIT": "100000",
+    })
+    sys.path.insert(0, ROOT)
+    from routing import POLICIES, router
+
+    try:
+        print(f"Mixed workload: {args.calls} calls per policy, {args.workers} workers (half bare ideas, half with style tips)")
+        for name in POLICIES:
+            print_row(name, run_policy(name, workload(args.calls), args.workers, config))
+
+        print(f"\nFailover: gpt-4 degraded to {args.degraded_latency}s, p95 budget {args.budget}s")
+        config.models["gpt-4"]["latency"] = args.degraded_latency
+        budget = router.budget
+        router.budget = args.budget
+        try:
+            print_row("quality", run_policy("quality", workload(args.calls, seed=1), args.workers, config))
+        finally:
+            router.budget = budget
+            config.models["gpt-4"]["latency"] = MODEL_SPEEDS["gpt-4"][0]
+
+        print(f"\nTruncation: {args.long_words}-word completions")
+        config.completion_text = completion(args.long_words)
+        for name in POLICIES:
+            print_row(name, run_policy(name, workload(args.calls, seed=2), args.workers, config))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Near-duplicate cache lookup benchmark.
+
+Fills semantic_cache.SemanticCache with N synthetic prompts spread over
+--namespaces namespaces (default: one per preset style × refinement, as
+bot.semantic_key produces), then times batched top-k lookups. Reports total and
+per-query latency for each batch size; batch 1 is the path every live lookup takes.
+
+Run from the repo root:  python benchmarks/similarity.py --items 100000 --batches 1 32 128
+Worst case, everything in one namespace:  python benchmarks/similarity.py --namespaces 1
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000, help="entries in the index")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 32, 128], help="queries per lookup")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--namespaces", type=int, default=None, help="namespaces to spread entries over")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from presets import MOODS, REFINEMENTS, STYLES, THEMES
+    from semantic_cache import SemanticCache
+
+    rng = random.Random(0)
+    vocabulary = " ".join(THEMES + MOODS).split()
+    if args.namespaces:
+        namespaces = [f"bench-{i}" for i in range(args.namespaces)]
+    else:
+        namespaces = [(style, refinement) for style in STYLES for refinement in REFINEMENTS]
+    texts = [" ".join(rng.sample(vocabulary, 5)) for _ in range(args.items)]
+    owners = [rng.choice(namespaces) for _ in texts]
+
+    cache = SemanticCache(max_items=args.items)
+    started = time.perf_counter()
+    for i, (namespace, text) in enumerate(zip(owners, texts)):
+        cache.add(namespace, text, str(i))
+    print(
+        f"Indexed {args.items} entries over {len(namespaces)} namespaces "
+        f"in {time.perf_counter() - started:.1f}s (dim {cache.dim})\n"
+    )
+
+    for batch in args.batches:
+        picked = rng.sample(range(args.items), batch)
+        queries = [texts[i] for i in picked]
+        query_namespaces = [owners[i] for i in picked]
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            cache.top_k(query_namespaces, queries, k=args.k)
+            samples.append(time.perf_counter() - started)
+        best = min(samples)
+        print(f"  batch {batch:<5} {best * 1000:8.2f} ms total  {best * 1000 / batch:7.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
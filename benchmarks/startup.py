@@ -0,0 +1,61 @@
+"""
+Cold-start benchmark: module import times and time to first render of app.py.
+
+Run from the repo root:  python benchmarks/startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["bot", "dalle_generator", "translate", "exports", "batch", "presets", "cache", "clients", "transport", "image_prompt", "metrics"]
+
+_IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {root!r}); "
+    "t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+)
+
+_RENDER_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {root!r}); "
+    "t = time.perf_counter(); "
+    "from streamlit.testing.v1 import AppTest; "
+    "at = AppTest.from_file({app!r}, default_timeout=60); "
+    "at.secrets['OPENAI_API_KEY'] = 'sk-benchmark'; "
+    "at.run(); "
+    "assert not at.exception, at.exception; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _time_fresh_process(code):
+    # A fresh interpreter per sample, so nothing is already in sys.modules
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _summary(samples):
+    return f"median {statistics.median(samples) * 1000:8.1f} ms   min {min(samples) * 1000:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    print("Import time (fresh interpreter per run)")
+    for module in MODULES:
+        samples = [_time_fresh_process(_IMPORT_SNIPPET.format(root=ROOT, module=module)) for _ in range(args.runs)]
+        print(f"  {module:<16} {_summary(samples)}")
+
+    app = os.path.join(ROOT, "app.py")
+    samples = [_time_fresh_process(_RENDER_SNIPPET.format(root=ROOT, app=app)) for _ in range(args.runs)]
+    print(f"\nTime to first render of app.py\n  {'app.py':<16} {_summary(samples)}")
+    print(f"\nTotal benchmark time {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
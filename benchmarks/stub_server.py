@@ -0,0 +1,269 @@
+"""
+Local stand-in for the OpenAI API and Google Translate, for benchmarks.
+
+Serves chat completions (plain, streamed and forced tool calls), DALL·E image generation plus the
+image downloads, and the Google Translate mobile page, with configurable
+latency and error rate. Every call is counted per endpoint.
+
+Run standalone:  python benchmarks/stub_server.py --port 8765 --latency 0.3
+"""
+import argparse
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _tiny_png(size=64):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes([200, 120, 220]) * size
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+
+
+PNG = _tiny_png()
+COMPLETION_TEXT = (
+    "A luminous watercolor scene of an elf queen in an enchanted forest, soft glowing fireflies, "
+    "misty morning light, delicate pastel palette, intricate leaf crown, dreamy and whimsical."
+)
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, token_latency=0.01, completion_text=COMPLETION_TEXT, generation_time=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token_latency = token_latency
+        self.completion_text = completion_text
+        # Also charge token_latency per generated word on non-streamed responses
+        self.generation_time = generation_time
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        # Optional per-model overrides: {"gpt-4": {"latency": 1.2, "token_latency": 0.03}}
+        self.models = {}
+
+    def count(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.calls)
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _sleep(self, model=None):
+        settings = self.config.models.get(model, {})
+        latency = settings.get("latency", self.config.latency)
+        time.sleep(max(0.0, random.gauss(latency, self.config.jitter)))
+
+    def _maybe_fail(self):
+        if random.random() < self.config.error_rate:
+            status = random.choice([429, 500, 503])
+            body = json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "0.2")
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        return False
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/images/"):
+            self.config.count("image_download")
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(PNG)))
+            self.end_headers()
+            self.wfile.write(PNG)
+        elif url.path.startswith("/translate"):
+            self.config.count("translate")
+            self._sleep()
+            if self._maybe_fail():
+                return
+            query = parse_qs(url.query)
+            text = query.get("q", [""])[0]
+            target = query.get("tl", ["en"])[0]
+            body = f'<html><body><div class="result-container">[{target}] {text}</div></body></html>'.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == "/stats":
+            self._json(self.config.snapshot())
+        else:
+            self._json({"error": {"message": "not found"}}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/stats/reset":
+            self.config.reset()
+            self._json({})
+            return
+        payload = self._read_json()
+        if url.path.endswith("/chat/completions"):
+            self._chat(payload)
+        elif url.path.endswith("/images/generations"):
+            self.config.count("images")
+            self._sleep()
+            if self._maybe_fail():
+                return
+            host = self.headers.get("Host")
+            self._json({
+                "created": int(time.time()),
+                "data": [{"url": f"http://{host}/images/{uuid.uuid4().hex}.png", "revised_prompt": payload.get("prompt")}],
+            })
+        else:
+            self._json({"error": {"message": "not found"}}, 404)
+
+    def _completion_text(self, payload):
+        return self.config.completion_text
+
+    def _chat(self, payload):
+        model = payload.get("model", "gpt-4")
+        self.config.count("chat")
+        self.config.count(f"chat:{model}")
+        self._sleep(model)
+        if self._maybe_fail():
+            return
+        text = self._completion_text(payload)
+        words = text.split(" ")
+        max_tokens = payload.get("max_tokens") or len(words)
+        finish_reason = "length" if len(words) > max_tokens else "stop"
+        words = words[:max_tokens]
+        usage = {"prompt_tokens": 60, "completion_tokens": len(words), "total_tokens": 60 + len(words)}
+        created = int(time.time())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        token_latency = self.config.models.get(model, {}).get("token_latency", self.config.token_latency)
+        if self.config.generation_time and not payload.get("stream"):
+            time.sleep(token_latency * len(words))
+
+        if payload.get("tools") and not payload.get("stream"):
+            # Structured calls: answer the forced tool with every schema field filled
+            tool = payload["tools"][0]["function"]
+            arguments = {field: " ".join(words) for field in tool["parameters"].get("required", [])}
+            self._json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "tool_calls", "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": tool["name"], "arguments": json.dumps(arguments)},
+                    }],
+                }}],
+                "usage": usage,
+            })
+            return
+
+        if not payload.get("stream"):
+            self._json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": finish_reason, "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(token_latency)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start(port=0, **config_kwargs):
+    """
+    Start the stub in a background thread. Returns (server, config, base_url).
+    """
+    config = StubConfig(**config_kwargs)
+    handler = type("BoundStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _, base_url = start(args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    print(f"Stub listening on {base_url}  (OPENAI_BASE_URL={base_url}/v1  TRANSLATE_BASE_URL={base_url}/translate)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
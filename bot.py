@@ -1,74 +1,410 @@
 import streamlit as st
-import os
-import openai
-from dotenv import load_dotenv
-from io import BytesIO
-from reportlab.pdfgen import canvas
-import zipfile
+import json
+import time
+from cache import prompt_cache
+from clients import get_openai_client
+from transport import endpoint_slot
+from metrics import metrics, record_usage
+from singleflight import flight
+from scheduler import scheduler, estimate_tokens, INTERACTIVE
+from semantic_cache import semantic_cache, semantic_parts, SEMANTIC_CACHE_ENABLED
+from routing import router, TRUNCATION_RETRIES
+import exports
 
-# Load environment variables
-load_dotenv()
+# Structured "Both" mode: one call returns every variant as emit_prompts arguments
+VARIANT_FIELDS = ("raw", "optimized", "midjourney", "artisly")
+VARIANTS_SYSTEM_MESSAGE = (
+    "You are an AI that writes prompts for AI image generators. Always answer by calling "
+    "emit_prompts with every variant filled in."
+)
+VARIANTS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "emit_prompts",
+        "description": "Return all prompt variants for the user's request.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "raw": {"type": "string", "description": "Raw, vivid, artistic version of the prompt."},
+                "optimized": {"type": "string", "description": "Clear, structured version optimized for AI clarity."},
+                "midjourney": {"type": "string", "description": "MidJourney-tuned prompt: comma-separated descriptors ending in parameters such as --ar 2:3 --v 6 --stylize 250."},
+                "artisly": {"type": "string", "description": "Artisly.ai-tuned prompt: full natural-language sentences, no -- parameters."},
+            },
+            "required": list(VARIANT_FIELDS),
+            "additionalProperties": False,
+        },
+    },
+}
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_prompt(user_prompt, refinement):
+class VariantsSchemaError(ValueError):
     """
-    Generate a creative or optimized prompt based on user input and refinement option.
+    The structured response didn't match the emit_prompts schema.
+    """
+
+def record_timing(timing, record):
     """
+    Fill the caller's `timing` dict, if any, with this call's latencies (seconds).
+    Kept per call rather than module-wide, since sessions share this module.
+    """
+    if timing is not None:
+        timing.update(record)
+
+# Appended to the system message when the caller targets one platform
+PLATFORM_HINTS = {
+    "midjourney": " Write it for MidJourney: comma-separated descriptors ending in parameters such as --ar 2:3 --v 6 --stylize 250.",
+    "artisly": " Write it for Artisly.ai: full natural-language sentences, no -- parameters.",
+}
+# Sent after a streamed completion was cut off at max_tokens
+CONTINUE_MESSAGE = "Continue exactly where you stopped, without repeating anything."
+
+def system_message(refinement, platform=None):
     if refinement == "🔥 Raw creative prompt":
-        system_msg = "You are a creative AI that generates vivid, imaginative, artistic prompts."
+        message = "You are a creative AI that generates vivid, imaginative, artistic prompts."
     elif refinement == "🎯 Optimized for AI clarity":
-        system_msg = "You are an AI trained to write clear, structured prompts optimized for use in MidJourney, DALL·E, and Artisly.ai."
+        message = "You are an AI trained to write clear, structured prompts optimized for use in MidJourney, DALL·E, and Artisly.ai."
     else:
-        system_msg = "You are an AI that first gives a raw, artistic version of the prompt, followed by a version optimized for AI clarity."
-
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_prompt}
-        ],
-        max_tokens=400
-    )
+        message = "You are an AI that first gives a raw, artistic version of the prompt, followed by a version optimized for AI clarity."
+    return message + PLATFORM_HINTS.get(platform, "")
+
+def chat_messages(system_msg, user_prompt):
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def semantic_key(user_prompt, system_msg, refinement, model):
+    """
+    (namespace, text) for the near-duplicate cache; everything but the fuzzy
+    text has to match exactly. max_tokens is left out: it scales with input
+    length, which near-duplicates differ in.
+    """
+    exact, text = semantic_parts(user_prompt)
+    return (model, system_msg, refinement, exact), text
+
+def timed_call(model, fn):
+    """
+    Run one API call and feed its duration to the router's latency window.
+    """
+    started = time.perf_counter()
+    result = fn()
+    router.observe(model, time.perf_counter() - started)
+    return result
+
+def similar_cached(namespace, text, span, validate=None):
+    """
+    Completion of an earlier, near-identical prompt, or None. When `validate`
+    raises ValueError on it, the entry is dropped and treated as a miss.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    match = semantic_cache.lookup(namespace, text)
+    if match is None:
+        return None
+    cached = prompt_cache.get(match[0])
+    if cached is not None and validate is not None:
+        try:
+            validate(cached)
+        except ValueError:
+            prompt_cache.delete(match[0])
+            return None
+    if cached is not None:
+        semantic_cache.record_hit()
+        span["cached"] = True
+        span["similarity"] = round(match[1], 3)
+    return cached
+
+def remember_similar(namespace, text, cache_key):
+    if SEMANTIC_CACHE_ENABLED:
+        semantic_cache.add(namespace, text, cache_key)
+
+def generate_prompt(user_prompt, refinement, priority=INTERACTIVE, platform=None):
+    """
+    Generate a creative or optimized prompt based on user input and refinement option.
+    Bulk callers pass priority=scheduler.BULK so UI clicks are served first; the
+    model and max_tokens come from the routing policy. `platform` ("midjourney"
+    or "artisly") tailors the prompt and its route to one generator.
+    """
+    system_msg = system_message(refinement, platform)
+    route = router.route(refinement, user_prompt, platform)
+    model, max_tokens = route["model"], route["max_tokens"]
+    cache_key = prompt_cache.key(model, system_msg, user_prompt, max_tokens, refinement)
+    with metrics.span("generate_prompt", model=model, refinement=refinement, rule=route["rule"]) as span:
+        if route["failover_from"]:
+            span["failover_from"] = route["failover_from"]
+        cached = prompt_cache.get(cache_key)
+        if cached is not None:
+            span["cached"] = True
+            return cached
+        namespace, text = semantic_key(user_prompt, system_msg, refinement, model)
+        cached = similar_cached(namespace, text, span)
+        if cached is not None:
+            return cached
+
+        messages = chat_messages(system_msg, user_prompt)
 
-    return response.choices[0].message.content
+        def _create(current):
+            with endpoint_slot("chat"):
+                # Retries go back through the scheduler instead of the SDK
+                return timed_call(current["model"], lambda: get_openai_client().with_options(max_retries=0).chat.completions.create(
+                    model=current["model"],
+                    messages=messages,
+                    max_tokens=current["max_tokens"]
+                ))
+
+        def _request():
+            span["coalesced"] = False
+            current = route
+            for attempt in range(TRUNCATION_RETRIES + 1):
+                reserved = estimate_tokens(messages, current["max_tokens"])
+                response = scheduler.call(lambda: _create(current), reserved, priority, span=span, model=current["model"])
+                record_usage(span, response.usage)
+                scheduler.settle(reserved, getattr(response.usage, "total_tokens", None), current["model"])
+                choice = response.choices[0]
+                if choice.finish_reason != "length":
+                    break
+                # Cut off at max_tokens: ask again with a bigger budget
+                span["truncated"] = attempt + 1
+                current = router.after_truncation(current)
+                if current is None:
+                    break
+            content = choice.message.content
+            # A prompt that is still cut off is shown but never cached as complete
+            if choice.finish_reason != "length":
+                prompt_cache.set(cache_key, content)
+                remember_similar(namespace, text, cache_key)
+            return content
+
+        # Identical requests already in flight share that call's result
+        span["coalesced"] = True
+        return flight.do(cache_key, _request)
+
+def generate_prompt_stream(user_prompt, refinement, timing=None, platform=None):
+    """
+    Streaming variant of generate_prompt: yields text deltas as they arrive.
+    A completion cut off at max_tokens is continued in the same stream.
+
+    Time-to-first-token and total time are written into `timing` when given.
+    """
+    system_msg = system_message(refinement, platform)
+    route = router.route(refinement, user_prompt, platform)
+    model, max_tokens = route["model"], route["max_tokens"]
+    cache_key = prompt_cache.key(model, system_msg, user_prompt, max_tokens, refinement)
+    with metrics.span("generate_prompt", model=model, refinement=refinement, rule=route["rule"], streamed=True) as span:
+        if route["failover_from"]:
+            span["failover_from"] = route["failover_from"]
+        started = time.perf_counter()
+        cached = prompt_cache.get(cache_key)
+        namespace, similar_text = semantic_key(user_prompt, system_msg, refinement, model)
+        if cached is None:
+            cached = similar_cached(namespace, similar_text, span)
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            span["cached"] = True
+            record_timing(timing, {"model": model, "refinement": refinement, "cached": True, "ttft": elapsed, "total": elapsed})
+            yield cached
+            return
+
+        call, leader = flight.begin(cache_key)
+        if not leader:
+            # Same prompt already streaming for another session: share its result
+            text = flight.wait(call)
+            elapsed = time.perf_counter() - started
+            span["coalesced"] = True
+            record_timing(timing, {"model": model, "refinement": refinement, "cached": False, "coalesced": True, "ttft": elapsed, "total": elapsed})
+            yield text
+            return
+
+        messages = chat_messages(system_msg, user_prompt)
+        ttft = None
+        parts = []
+        finish_reason = None
+        error = None
+        try:
+            current, request_messages = route, messages
+            for attempt in range(TRUNCATION_RETRIES + 1):
+                reserved = estimate_tokens(request_messages, current["max_tokens"])
+                # Only opening the stream is scheduled; a 429 arrives before any delta
+                stream = scheduler.call(
+                    lambda: get_openai_client().with_options(max_retries=0).chat.completions.create(
+                        model=current["model"],
+                        messages=request_messages,
+                        max_tokens=current["max_tokens"],
+                        stream=True,
+                        stream_options={"include_usage": True}
+                    ),
+                    reserved, INTERACTIVE, span=span, model=current["model"],
+                )
+                finish_reason = None
+                with endpoint_slot("chat"):
+                    for chunk in stream:
+                        if getattr(chunk, "usage", None):
+                            record_usage(span, chunk.usage)
+                            scheduler.settle(reserved, getattr(chunk.usage, "total_tokens", None), current["model"])
+                        if not chunk.choices:
+                            continue
+                        finish_reason = chunk.choices[0].finish_reason or finish_reason
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        parts.append(delta)
+                        yield delta
+                if finish_reason != "length":
+                    break
+                # Cut off at max_tokens: the start is already on screen, so ask
+                # for the rest with a bigger budget instead of starting over
+                span["truncated"] = attempt + 1
+                current = router.after_truncation(current)
+                if current is None:
+                    break
+                request_messages = messages + [
+                    {"role": "assistant", "content": "".join(parts)},
+                    {"role": "user", "content": CONTINUE_MESSAGE}
+                ]
+        except Exception as e:
+            error = e
+            raise
+        except BaseException:
+            # Consumer stopped reading (rerun, closed tab); followers must not hang
+            error = RuntimeError("coalesced call was interrupted")
+            raise
+        finally:
+            text = "".join(parts)
+            if error is None and finish_reason != "length":
+                prompt_cache.set(cache_key, text)
+                remember_similar(namespace, similar_text, cache_key)
+            flight.finish(cache_key, call, result=text, error=error)
+
+        total = time.perf_counter() - started
+        span["ttft"] = ttft or total
+        # Call time is opening plus reading the stream, not the queue wait
+        router.observe(model, total - span.get("queued_s", 0.0))
+        record_timing(timing, {"model": model, "refinement": refinement, "cached": False, "ttft": ttft or total, "total": total, "queued": span.get("queued_s", 0.0)})
+
+def parse_variants(arguments):
+    """
+    Validate emit_prompts arguments into a {field: text} dict. Harmless
+    deviations (code fences, text around the JSON, extra keys) are repaired
+    locally; anything else raises VariantsSchemaError.
+    """
+    text = (arguments or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        try:
+            data = json.loads(text[start:end + 1]) if 0 <= start < end else None
+        except json.JSONDecodeError:
+            data = None
+    if not isinstance(data, dict):
+        raise VariantsSchemaError("response is not a JSON object")
+    missing = [f for f in VARIANT_FIELDS if not isinstance(data.get(f), str) or not data[f].strip()]
+    if missing:
+        raise VariantsSchemaError(f"missing or empty fields: {', '.join(missing)}")
+    return {f: data[f].strip() for f in VARIANT_FIELDS}
+
+def _tool_arguments(message):
+    if message.tool_calls:
+        return message.tool_calls[0].function.arguments
+    # Some models answer with plain JSON content despite tool_choice
+    return message.content
+
+def generate_prompt_variants(user_prompt, priority=INTERACTIVE, schema_retries=1, timing=None):
+    """
+    Structured "Both" mode: a single completion returning raw, optimized,
+    MidJourney and Artisly.ai variants as a dict keyed by VARIANT_FIELDS.
+
+    Transport errors and 429s are retried by the scheduler; only a response
+    that fails schema validation is sent back once for repair.
+    """
+    route = router.route("variants", user_prompt)
+    model, max_tokens = route["model"], route["max_tokens"]
+    cache_key = prompt_cache.key(model, VARIANTS_SYSTEM_MESSAGE, user_prompt, max_tokens, "variants")
+    with metrics.span("generate_prompt_variants", model=model, rule=route["rule"]) as span:
+        if route["failover_from"]:
+            span["failover_from"] = route["failover_from"]
+        started = time.perf_counter()
+        cached = prompt_cache.get(cache_key)
+        if cached is not None:
+            try:
+                cached = parse_variants(cached)
+            except VariantsSchemaError:
+                # Corrupt or pre-upgrade entry: drop it and treat it as a miss
+                prompt_cache.delete(cache_key)
+                cached = None
+        namespace, text = semantic_key(user_prompt, VARIANTS_SYSTEM_MESSAGE, "variants", model)
+        if cached is None:
+            cached = similar_cached(namespace, text, span, validate=parse_variants)
+            cached = parse_variants(cached) if cached is not None else None
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            span["cached"] = True
+            record_timing(timing, {"model": model, "refinement": "variants", "cached": True, "ttft": elapsed, "total": elapsed})
+            return cached
+
+        def _request():
+            span["coalesced"] = False
+            messages = chat_messages(VARIANTS_SYSTEM_MESSAGE, user_prompt)
+            current = route
+            for attempt in range(schema_retries + 1):
+                reserved = estimate_tokens(messages, current["max_tokens"])
+
+                def _create():
+                    with endpoint_slot("chat"):
+                        return timed_call(current["model"], lambda: get_openai_client().with_options(max_retries=0).chat.completions.create(
+                            model=current["model"],
+                            messages=messages,
+                            max_tokens=current["max_tokens"],
+                            tools=[VARIANTS_TOOL],
+                            tool_choice={"type": "function", "function": {"name": "emit_prompts"}}
+                        ))
+
+                response = scheduler.call(_create, reserved, priority, span=span, model=current["model"])
+                record_usage(span, response.usage)
+                scheduler.settle(reserved, getattr(response.usage, "total_tokens", None), current["model"])
+                choice = response.choices[0]
+                arguments = _tool_arguments(choice.message)
+                try:
+                    variants = parse_variants(arguments)
+                except VariantsSchemaError as e:
+                    span["schema_errors"] = attempt + 1
+                    if attempt == schema_retries:
+                        raise
+                    if choice.finish_reason == "length":
+                        # Cut off mid-JSON: the same request with a bigger budget
+                        span["truncated"] = attempt + 1
+                        current = router.after_truncation(current) or current
+                    else:
+                        messages = messages + [
+                            {"role": "assistant", "content": arguments or ""},
+                            {"role": "user", "content": f"That response failed validation ({e}). Call emit_prompts again with every field as a non-empty string."}
+                        ]
+                    continue
+                prompt_cache.set(cache_key, json.dumps(variants, ensure_ascii=False))
+                remember_similar(namespace, text, cache_key)
+                return variants
+
+        span["coalesced"] = True
+        variants = flight.do(cache_key, _request)
+        total = time.perf_counter() - started
+        record_timing(timing, {"model": model, "refinement": "variants", "cached": False, "ttft": total, "total": total, "queued": span.get("queued_s", 0.0)})
+        return variants
 
 def show_cache_clear_button():
     if st.button("🔄 Clear Cache"):
         st.cache_data.clear()
+        prompt_cache.clear()
+        semantic_cache.clear()
+        exports.clear()
         st.success("Cache cleared!")
-
-def download_prompt_as_txt(prompt):
-    return BytesIO(prompt.encode("utf-8"))
-
-def download_prompt_as_pdf(prompt):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer)
-    textobject = c.beginText(40, 800)
-    for line in prompt.split("\n"):
-        textobject.textLine(line)
-    c.drawText(textobject)
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer
-
-def create_zip_file(prompt, image_url=None):
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w") as zipf:
-        # Add TXT
-        zipf.writestr("prompt.txt", prompt)
-        
-        # Add PDF
-        pdf_bytes = download_prompt_as_pdf(prompt).read()
-        zipf.writestr("prompt.pdf", pdf_bytes)
-
-        # Add image (placeholder)
-        if image_url:
-            import requests
-            image_data = requests.get(image_url).content
-            zipf.writestr("preview.png", image_data)
-
-    zip_buffer.seek(0)
-    return zip_buffer
\ No newline at end of file
+    stats = prompt_cache.stats()
+    coalesced = flight.stats()["coalesced"]
+    similar = semantic_cache.stats()["hits"]
+    st.caption(
+        f"Prompt cache: {stats['hits']} hits / {stats['misses']} misses · "
+        f"{similar} near-duplicate hits · {coalesced} duplicate calls coalesced"
+    )
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
+SPOOL_MAX_BYTES = int(os.getenv("BUNDLE_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+# Already-compressed payloads are stored as-is instead of deflated again
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".zip", ".pdf")
+
+
+def _compress_type(name):
+    return zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+
+class BundleWriter:
+    """
+    ZIP writer that adds entries one at a time and never holds the archive in
+    memory: it writes to `path` when given, otherwise to a SpooledTemporaryFile
+    that moves to disk once it passes SPOOL_MAX_BYTES. File entries are
+    copied in CHUNK_SIZE pieces.
+    """
+
+    def __init__(self, path=None, spool_max_bytes=SPOOL_MAX_BYTES):
+        self.path = path
+        if path:
+            self.file = open(path, "w+b")
+        else:
+            self.file = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, suffix=".zip")
+        self._zip = zipfile.ZipFile(self.file, "w", zipfile.ZIP_DEFLATED)
+        self.entries = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Finish the archive, then release the file handle behind it
+        self.close().close()
+
+    def add_text(self, name, text):
+        self.add_bytes(name, text.encode("utf-8"))
+
+    def add_bytes(self, name, data):
+        self._zip.writestr(name, data, compress_type=_compress_type(name))
+        self.entries += 1
+
+    def add_file(self, name, path):
+        info = zipfile.ZipInfo.from_file(path, name)
+        info.compress_type = _compress_type(name)
+        with open(path, "rb") as src, self._zip.open(info, "w") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        self.entries += 1
+
+    def close(self):
+        """
+        Finish the archive and return its file object, rewound for reading.
+        """
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        self.file.flush()
+        self.file.seek(0)
+        return self.file
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.getenv("PROMPT_CACHE_PATH", os.path.join(".cache", "prompt_cache.sqlite3"))
+CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+class PromptCache:
+    """
+    Two-tier completion cache: an in-memory LRU in front of a SQLite table
+    that survives restarts. Entries expire after `ttl` seconds and each tier
+    is bounded by item count (oldest access evicted first).
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_memory_items=256, max_disk_items=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    @staticmethod
+    def key(*parts):
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _conn(self):
+        if self._db is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            try:
+                db = self._conn()
+                row = db.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+                if row:
+                    db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    db.commit()
+            except sqlite3.Error as e:
+                print(f"Prompt cache read error: {e}")
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            try:
+                db = self._conn()
+                db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                db.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl,))
+                db.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_items,),
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Prompt cache write error: {e}")
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            try:
+                db = self._conn()
+                db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Prompt cache delete error: {e}")
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+            try:
+                db = self._conn()
+                db.execute("DELETE FROM cache")
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Prompt cache clear error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_items": len(self._memory)}
+
+
+prompt_cache = PromptCache()
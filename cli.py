@@ -0,0 +1,65 @@
+"""
+Headless bulk prompt generation.
+
+    python cli.py ideas.csv -o prompts.jsonl --workers 8 --language Spanish
+    python cli.py ideas.jsonl --offline --export-dir exports/
+    python cli.py ideas.csv -o prompts.jsonl --bundle listing_pack.zip
+
+Input rows need an idea/theme column; style, mood, refinement, language and
+platform columns are optional and override the command-line defaults.
+"""
+import argparse
+import sys
+import time
+
+from bundle import BundleWriter
+from pipeline import bundle_results, read_jobs, run_pipeline, write_jsonl
+from presets import LANGUAGES, PLATFORMS, REFINEMENTS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file of ideas")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="parallel jobs")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="jobs buffered ahead of the writer (default: 2 × workers)")
+    parser.add_argument("--refinement", choices=REFINEMENTS, default=REFINEMENTS[0])
+    parser.add_argument("--language", choices=LANGUAGES, default="English")
+    parser.add_argument("--platform", choices=list(PLATFORMS), default=None, help="tailor prompts for one generator")
+    parser.add_argument("--no-tips", action="store_true", help="don't append Etsy output tips")
+    parser.add_argument("--offline", action="store_true", help="use the offline prompt engine, no API calls")
+    parser.add_argument("--export-dir", help="also write a TXT and PDF per row into this folder")
+    parser.add_argument("--bundle", help="also stream every row's TXT and PDF into this ZIP file")
+    args = parser.parse_args(argv)
+
+    results = run_pipeline(
+        read_jobs(args.input),
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        refinement=args.refinement,
+        language=args.language,
+        platform=args.platform,
+        apply_tips=not args.no_tips,
+        offline=args.offline,
+        export_dir=args.export_dir,
+    )
+
+    started = time.perf_counter()
+    bundle = BundleWriter(args.bundle) if args.bundle else None
+    if bundle:
+        results = bundle_results(results, bundle)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        written, failed = write_jsonl(results, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if bundle:
+            bundle.close().close()
+    elapsed = time.perf_counter() - started
+    print(f"{written} rows in {elapsed:.1f}s ({written / elapsed if elapsed else 0:.1f}/s), {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import os
+import streamlit as st
+
+
+def get_api_key():
+    """
+    Read OPENAI_API_KEY from Streamlit secrets, falling back to the environment / .env file.
+    """
+    try:
+        key = st.secrets.get("OPENAI_API_KEY")
+    except Exception:
+        key = None
+    if key:
+        return key
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("OPENAI_API_KEY")
+
+
+@st.cache_resource
+def get_openai_client():
+    """
+    The one OpenAI client for this process, built on first use.
+
+    It rides on the pooled transport client; the SDK retries 429/5xx up to
+    MAX_RETRIES times and honors Retry-After between attempts.
+    """
+    import openai
+    import transport
+    return openai.OpenAI(
+        api_key=get_api_key(),
+        base_url=transport.BASE_URL,
+        http_client=transport.get_http_client(),
+        timeout=transport.timeout(),
+        max_retries=transport.MAX_RETRIES,
+    )
+
+
+def new_async_openai_client(**kwargs):
+    # Async clients hold connections bound to an event loop, so each batch run builds its own
+    from openai import AsyncOpenAI
+    import transport
+    kwargs.setdefault("max_retries", transport.MAX_RETRIES)
+    return AsyncOpenAI(
+        api_key=get_api_key(),
+        base_url=transport.BASE_URL,
+        http_client=transport.new_async_http_client(),
+        timeout=transport.timeout(),
+        **kwargs,
+    )
@@ -1,17 +1,17 @@
-from openai import OpenAI
-import os
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from clients import get_openai_client
+from metrics import metrics
+from transport import endpoint_slot
 
 def generate_dalle_image(prompt):
     try:
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1
-        )
+        with metrics.span("generate_dalle_image", model="dall-e-3"), endpoint_slot("images"):
+            response = get_openai_client().images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size="1024x1024",
+                quality="standard",
+                n=1
+            )
         return response.data[0].url
     except Exception as e:
         print("Error generating image:", e)
@@ -0,0 +1,168 @@
+import csv
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO, StringIO
+from xml.sax.saxutils import escape
+
+from bundle import BundleWriter
+from metrics import metrics
+from singleflight import flight
+
+MAX_CACHED_ARTIFACTS = 32
+BUNDLE_DIR = os.getenv("EXPORT_BUNDLE_DIR", os.path.join(".cache", "bundles"))
+# Bundles used within this many seconds are never pruned, so a download
+# another session is still serving can't disappear under it
+BUNDLE_GRACE_S = float(os.getenv("EXPORT_BUNDLE_GRACE", "600"))
+
+_artifacts = OrderedDict()
+_lock = threading.Lock()
+
+
+def _content_key(kind, *parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return kind, digest.hexdigest()
+
+
+def _memoized(key, build):
+    with _lock:
+        if key in _artifacts:
+            _artifacts.move_to_end(key)
+            return _artifacts[key]
+    data = build()
+    with _lock:
+        _artifacts[key] = data
+        while len(_artifacts) > MAX_CACHED_ARTIFACTS:
+            _artifacts.popitem(last=False)
+    return data
+
+
+def is_built(kind, *parts):
+    key = _content_key(kind, *parts)
+    if kind == "zip":
+        return os.path.exists(_bundle_path(key))
+    with _lock:
+        return key in _artifacts
+
+
+def build_txt(prompt, optimized_prompt="", variants=None):
+    """
+    Plain-text export. With "Both" variants, the platform-tuned prompts lead and
+    the raw and optimized versions follow.
+    """
+    if variants and variants.get("midjourney"):
+        return (
+            f"MidJourney: {variants['midjourney']}\n\nArtisly.ai: {variants['artisly']}"
+            f"\n\nRaw: {prompt}\n\nOptimized: {optimized_prompt}"
+        )
+    return f"MidJourney: {prompt}\n\nArtisly.ai: {optimized_prompt or prompt}"
+
+
+def build_pdf(txt):
+    """
+    Render the prompt text as a one-page PDF. Memoized by content hash.
+    """
+    def _build():
+        from reportlab.platypus import SimpleDocTemplate, Paragraph
+        from reportlab.lib.styles import getSampleStyleSheet
+
+        with metrics.span("export_pdf") as span:
+            buffer = BytesIO()
+            doc = SimpleDocTemplate(buffer)
+            styles = getSampleStyleSheet()
+            story = [Paragraph(escape(txt).replace("\n", "<br/>"), styles["Normal"])]
+            doc.build(story)
+            span["bytes"] = buffer.tell()
+        return buffer.getvalue()
+
+    return _memoized(_content_key("pdf", txt), _build)
+
+
+def build_csv(rows):
+    """
+    Batch results as CSV text, one column per result key.
+    """
+    with metrics.span("export_csv", rows=len(rows)) as span:
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+        span["bytes"] = buffer.tell()
+    return buffer.getvalue()
+
+
+def _bundle_path(key):
+    return os.path.join(BUNDLE_DIR, f"{key[1]}.zip")
+
+
+def _prune_bundles():
+    bundles = sorted(glob.glob(os.path.join(BUNDLE_DIR, "*.zip")), key=os.path.getmtime)
+    cutoff = time.time() - BUNDLE_GRACE_S
+    for path in bundles[:-MAX_CACHED_ARTIFACTS]:
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            # Already pruned by another session, or still open elsewhere
+            pass
+
+
+def build_zip(txt, image_paths=()):
+    """
+    Bundle prompt.txt, prompt.pdf and any locally stored preview images into a
+    ZIP on disk and return its path. Bundles are content-addressed, so an
+    existing one is reused as-is.
+    """
+    path = _bundle_path(_content_key("zip", txt, *image_paths))
+    try:
+        # Mark an existing bundle as recently used so pruning leaves it alone
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    # Sessions asking for the same bundle at once share one build
+    return flight.do(("bundle", path), _write_bundle, path, txt, image_paths)
+
+
+def _write_bundle(path, txt, image_paths):
+    if os.path.exists(path):
+        return path
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    # A private temp file per build: the bundle only ever appears complete,
+    # even with another process building the same one
+    fd, partial = tempfile.mkstemp(dir=BUNDLE_DIR, suffix=".part")
+    os.close(fd)
+    try:
+        with metrics.span("export_zip") as span:
+            with BundleWriter(partial) as bundle:
+                bundle.add_text("prompt.txt", txt)
+                bundle.add_bytes("prompt.pdf", build_pdf(txt))
+                for i, image_path in enumerate(image_paths, 1):
+                    bundle.add_file(f"preview_{i}.png", image_path)
+            os.replace(partial, path)
+            span["bytes"] = os.path.getsize(path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    _prune_bundles()
+    return path
+
+
+def clear():
+    with _lock:
+        _artifacts.clear()
+    for path in glob.glob(os.path.join(BUNDLE_DIR, "*.zip")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+HISTORY_PATH = os.getenv("PROMPT_HISTORY_PATH", os.path.join(".cache", "prompt_history.sqlite3"))
+MAX_HISTORY_PER_USER = int(os.getenv("PROMPT_HISTORY_MAX_PER_USER", "1000"))
+MAX_FAVORITES_PER_USER = int(os.getenv("PROMPT_FAVORITES_MAX_PER_USER", "500"))
+# Visitors who aren't signed in are keyed "anon:<id>"; their rows are swept
+# once they've saved nothing for this long
+ANONYMOUS_PREFIX = "anon:"
+ANONYMOUS_MAX_AGE_S = float(os.getenv("PROMPT_HISTORY_ANONYMOUS_MAX_AGE", str(30 * 24 * 3600)))
+SWEEP_INTERVAL_S = 3600
+
+HISTORY = "history"
+FAVORITE = "favorite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (user_id, kind, content_hash)
+);
+CREATE INDEX IF NOT EXISTS prompts_recent ON prompts (user_id, kind, created_at DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(text, content='prompts', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS prompts_ai AFTER INSERT ON prompts BEGIN
+    INSERT INTO prompts_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS prompts_ad AFTER DELETE ON prompts BEGIN
+    INSERT INTO prompts_fts (prompts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS prompts_au AFTER UPDATE OF text ON prompts BEGIN
+    INSERT INTO prompts_fts (prompts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO prompts_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+
+def _fts_query(query):
+    # Quote each word so user input can't break FTS5 syntax; prefix-match the words
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+class HistoryStore:
+    """
+    Per-user prompt history and favorites in SQLite, deduplicated by content hash
+    and searchable through an FTS5 index. Each list keeps only its newest entries,
+    and anonymous users that went quiet are swept at most once per SWEEP_INTERVAL_S.
+    """
+
+    def __init__(self, path=HISTORY_PATH, max_history=MAX_HISTORY_PER_USER, max_favorites=MAX_FAVORITES_PER_USER,
+                 anonymous_max_age=ANONYMOUS_MAX_AGE_S):
+        self.path = path
+        self.limits = {HISTORY: max_history, FAVORITE: max_favorites}
+        self.anonymous_max_age = anonymous_max_age
+        self._lock = threading.Lock()
+        self._db = None
+        self._last_sweep = 0.0
+
+    def _conn(self):
+        if self._db is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._db.commit()
+        return self._db
+
+    def add(self, user_id, text, kind=HISTORY):
+        """
+        Save a prompt; saving the same text again just moves it to the top.
+        """
+        text = (text or "").strip()
+        if not text:
+            return
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT INTO prompts (user_id, kind, content_hash, text, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, kind, content_hash) DO UPDATE SET created_at = excluded.created_at",
+                (user_id, kind, content_hash, text, time.time()),
+            )
+            db.execute(
+                "DELETE FROM prompts WHERE id IN ("
+                "SELECT id FROM prompts WHERE user_id = ? AND kind = ? "
+                "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (user_id, kind, self.limits[kind]),
+            )
+            if time.time() - self._last_sweep >= SWEEP_INTERVAL_S:
+                self._sweep(db, ANONYMOUS_PREFIX, self.anonymous_max_age)
+            db.commit()
+
+    def page(self, user_id, kind=HISTORY, page=0, page_size=10):
+        """
+        One page of prompts, newest first. Returns (rows, total_count).
+        """
+        with self._lock:
+            db = self._conn()
+            total = db.execute(
+                "SELECT COUNT(*) FROM prompts WHERE user_id = ? AND kind = ?", (user_id, kind)
+            ).fetchone()[0]
+            rows = db.execute(
+                "SELECT id, text, created_at FROM prompts WHERE user_id = ? AND kind = ? "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (user_id, kind, page_size, page * page_size),
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def search(self, user_id, query, kind=None, limit=20):
+        """
+        Full-text search over a user's prompts, best matches first.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT p.id, p.kind, p.text, p.created_at FROM prompts_fts "
+            "JOIN prompts p ON p.id = prompts_fts.rowid "
+            "WHERE prompts_fts MATCH ? AND p.user_id = ?"
+        )
+        params = [match, user_id]
+        if kind:
+            sql += " AND p.kind = ?"
+            params.append(kind)
+        sql += " ORDER BY bm25(prompts_fts) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def sweep(self, prefix=ANONYMOUS_PREFIX, max_age=None):
+        """
+        Delete every prompt of users under `prefix` whose newest entry is older
+        than `max_age` seconds. Returns the number of rows removed.
+        """
+        with self._lock:
+            db = self._conn()
+            removed = self._sweep(db, prefix, self.anonymous_max_age if max_age is None else max_age)
+            db.commit()
+        return removed
+
+    def _sweep(self, db, prefix, max_age):
+        self._last_sweep = time.time()
+        cursor = db.execute(
+            "DELETE FROM prompts WHERE user_id IN ("
+            "SELECT user_id FROM prompts WHERE substr(user_id, 1, ?) = ? "
+            "GROUP BY user_id HAVING MAX(created_at) < ?)",
+            (len(prefix), prefix, self._last_sweep - max_age),
+        )
+        return cursor.rowcount
+
+    def clear(self, user_id, kind=None):
+        with self._lock:
+            db = self._conn()
+            if kind:
+                db.execute("DELETE FROM prompts WHERE user_id = ? AND kind = ?", (user_id, kind))
+            else:
+                db.execute("DELETE FROM prompts WHERE user_id = ?", (user_id,))
+            db.commit()
+
+
+history_store = HistoryStore()
@@ -0,0 +1,73 @@
+import hashlib
+import hmac
+import os
+import secrets
+import uuid
+
+from history_store import ANONYMOUS_MAX_AGE_S, ANONYMOUS_PREFIX
+
+COOKIE_NAME = "artistic_anon_id"
+# Set ANONYMOUS_ID_SECRET when running several replicas; otherwise a random
+# key is generated once and kept on disk so cookies survive restarts
+SECRET_PATH = os.getenv("ANONYMOUS_ID_SECRET_PATH", os.path.join(".cache", "anonymous_id.key"))
+
+_secret = None
+
+
+def _load_secret():
+    global _secret
+    if _secret is None:
+        secret = os.getenv("ANONYMOUS_ID_SECRET")
+        if secret:
+            _secret = secret.encode("utf-8")
+            return _secret
+        folder = os.path.dirname(SECRET_PATH)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        try:
+            fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(SECRET_PATH, "rb") as f:
+                _secret = f.read()
+        else:
+            # First process to get here writes the key; the rest read it back
+            with os.fdopen(fd, "wb") as f:
+                _secret = secrets.token_hex(32).encode("ascii")
+                f.write(_secret)
+    return _secret
+
+
+def _signature(token):
+    return hmac.new(_load_secret(), token.encode("ascii"), hashlib.sha256).hexdigest()[:32]
+
+
+def new_cookie():
+    """
+    A fresh "<token>.<signature>" cookie value for a visitor without one.
+    """
+    token = uuid.uuid4().hex
+    return f"{token}.{_signature(token)}"
+
+
+def anonymous_id(cookie):
+    """
+    History user ID for a signed cookie value, or None when it's missing,
+    malformed or wasn't signed with our key.
+    """
+    token, _, signature = (cookie or "").partition(".")
+    if len(token) != 32 or not all(c in "0123456789abcdef" for c in token):
+        return None
+    if not hmac.compare_digest(signature, _signature(token)):
+        return None
+    return f"{ANONYMOUS_PREFIX}{token}"
+
+
+def cookie_script(cookie):
+    """
+    Script that (re)sets the cookie in the browser, renewing its lifetime.
+    Streamlit can read request cookies but has no API to set one.
+    """
+    return (
+        f"<script>document.cookie = '{COOKIE_NAME}={cookie}; Max-Age={int(ANONYMOUS_MAX_AGE_S)}; "
+        f"Path=/; SameSite=Lax';</script>"
+    )
@@ -0,0 +1,143 @@
+import base64
+import hashlib
+import math
+import os
+from io import BytesIO
+
+from cache import prompt_cache
+from clients import get_openai_client
+from metrics import metrics, record_usage
+from transport import endpoint_slot
+
+VISION_MODEL = "gpt-4o"
+VISION_MAX_TOKENS = 500
+# "low" caps every image at 85 tokens; "auto"/"high" bill per 512px tile and are opt-in
+VISION_DETAIL = os.getenv("VISION_DETAIL", "low")
+# At low detail the model only ever sees a 512px image, so send nothing bigger
+MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "512" if VISION_DETAIL == "low" else "1024"))
+JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+def estimate_vision_tokens(width, height, detail=VISION_DETAIL):
+    """
+    gpt-4o image token cost at high detail: fit in 2048², shortest side to 768,
+    then 170 tokens per 512px tile plus 85 base tokens.
+    """
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def content_hash(image):
+    """
+    sha256 over the decoded, orientation-corrected pixels: the same picture
+    re-uploaded (or re-saved losslessly) hashes the same, while colourways and
+    near-identical mockups never share a key.
+    """
+    normalized = image.convert("RGBA")
+    digest = hashlib.sha256(f"{normalized.size[0]}x{normalized.size[1]}".encode())
+    digest.update(normalized.tobytes())
+    return digest.hexdigest()
+
+
+def preprocess_image(image_bytes, max_edge=MAX_EDGE):
+    """
+    Detect the real format, downscale to `max_edge` and re-encode compactly.
+
+    Returns (payload_bytes, mime_type, image_hash, report).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(image_bytes)) as opened:
+        source_format = opened.format
+        image = ImageOps.exif_transpose(opened)
+        original_size = image.size
+        image_hash = content_hash(image)
+
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        out = BytesIO()
+        if has_alpha:
+            image.save(out, "PNG", optimize=True)
+            mime_type = "image/png"
+        else:
+            image.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            mime_type = "image/jpeg"
+        sent_size = image.size
+
+    payload = out.getvalue()
+    if len(payload) >= len(image_bytes) and sent_size == original_size and source_format in MIME_TYPES:
+        # Already small and compact: send the original as-is, with its real type
+        payload, mime_type = image_bytes, MIME_TYPES[source_format]
+
+    original_tokens = estimate_vision_tokens(*original_size, detail="auto")
+    sent_tokens = estimate_vision_tokens(*sent_size)
+    report = {
+        "format": source_format,
+        "original_size": original_size,
+        "sent_size": sent_size,
+        "original_bytes": len(image_bytes),
+        "sent_bytes": len(payload),
+        "bytes_saved": len(image_bytes) - len(payload),
+        "original_tokens": original_tokens,
+        "sent_tokens": sent_tokens,
+        "tokens_saved": original_tokens - sent_tokens,
+        "cached": False,
+    }
+    return payload, mime_type, image_hash, report
+
+
+def analyze_image(image_bytes, mime_type="image/jpeg"):
+    """
+    Ask gpt-4o to describe an uploaded image as an AI art prompt.
+    """
+    data_url = f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode()}"
+    with metrics.span("vision", model=VISION_MODEL, image_bytes=len(image_bytes)) as span, endpoint_slot("vision"):
+        response = get_openai_client().chat.completions.create(
+            model=VISION_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a professional artist assistant. Analyze the uploaded image and describe it as a highly imaginative AI art prompt."
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "Generate an AI art prompt based on this image."},
+                        {"type": "image_url", "image_url": {"url": data_url, "detail": VISION_DETAIL}}
+                    ]
+                }
+            ],
+            max_tokens=VISION_MAX_TOKENS,
+        )
+        record_usage(span, response.usage)
+    return response.choices[0].message.content.strip()
+
+
+def analyze_uploaded_image(image_bytes):
+    """
+    Preprocess an upload and analyze it, reusing the cached prompt for an image
+    that was already analyzed. Returns (prompt, report).
+    """
+    payload, mime_type, image_hash, report = preprocess_image(image_bytes)
+    cache_key = prompt_cache.key(VISION_MODEL, "image-to-prompt", image_hash, MAX_EDGE, VISION_DETAIL, VISION_MAX_TOKENS)
+    cached = prompt_cache.get(cache_key)
+    if cached is not None:
+        with metrics.span("vision", model=VISION_MODEL, cached=True):
+            pass
+        report["cached"] = True
+        report["bytes_saved"] = report["original_bytes"]
+        report["tokens_saved"] = report["original_tokens"]
+        report["sent_bytes"] = report["sent_tokens"] = 0
+        return cached, report
+
+    image_prompt = analyze_image(payload, mime_type)
+    prompt_cache.set(cache_key, image_prompt)
+    return image_prompt, report
@@ -0,0 +1,93 @@
+import glob
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dalle_generator import generate_dalle_image
+from singleflight import flight
+import transport
+
+STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(".cache", "images"))
+THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "320"))
+MAX_VARIANTS = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_VARIANTS, thread_name_prefix="dalle")
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _folder(prompt):
+    return os.path.join(STORE_DIR, prompt_key(prompt))
+
+
+def _image_path(prompt, variant):
+    return os.path.join(_folder(prompt), f"{variant}.png")
+
+
+def _thumbnail_path(image_path):
+    return image_path[:-len(".png")] + ".thumb.jpg"
+
+
+def make_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """
+    Write a small JPEG preview next to the stored image and return its path.
+    """
+    thumb_path = _thumbnail_path(image_path)
+    if not os.path.exists(thumb_path):
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            image.thumbnail((size, size))
+            image.convert("RGB").save(thumb_path, "JPEG", quality=80, optimize=True)
+    return thumb_path
+
+
+def get_variants(prompt):
+    """
+    Locally stored variants for this prompt, as [{"path", "thumbnail"}] in variant order.
+    """
+    paths = sorted(
+        glob.glob(os.path.join(_folder(prompt), "*.png")),
+        key=lambda p: int(os.path.basename(p).split(".")[0]),
+    )
+    return [{"path": p, "thumbnail": make_thumbnail(p)} for p in paths]
+
+
+def _fetch_variant(prompt, path):
+    if os.path.exists(path):
+        return path
+    image_url = generate_dalle_image(prompt)
+    if not image_url:
+        return None
+    return transport.download_to_file(image_url, path)
+
+
+def _generate_variant(prompt, variant):
+    path = _image_path(prompt, variant)
+    # Coalesced per stored file, so concurrent clicks for the same prompt share
+    # one DALL·E call while distinct variants still run in parallel
+    if not flight.do(("image", path), _fetch_variant, prompt, path):
+        return None
+    return {"path": path, "thumbnail": make_thumbnail(path)}
+
+
+def generate_variants(prompt, n=1):
+    """
+    Make sure `n` variants of `prompt` exist on disk, requesting missing ones from
+    DALL·E in parallel. Each image is downloaded once; later calls are served locally.
+    """
+    n = max(1, min(n, MAX_VARIANTS))
+    os.makedirs(_folder(prompt), exist_ok=True)
+    futures = [_executor.submit(_generate_variant, prompt, i) for i in range(n)]
+    results = []
+    for future in futures:
+        try:
+            result = future.result()
+        except Exception as e:
+            print("Error storing image:", e)
+            result = None
+        if result:
+            results.append(result)
+    return results
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Optional: also append every finished span to this JSONL file
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH")
+PROMETHEUS_PREFIX = "artistic"
+
+
+class Metrics:
+    """
+    Process-wide stage timings, token usage and cache hits.
+
+    Each `span` records one timed stage; aggregates are kept per stage and a
+    bounded window of recent spans is kept for the debug panel and exporters.
+    """
+
+    def __init__(self, max_spans=500, window=500):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=max_spans)
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._errors = defaultdict(int)
+        self._cache_hits = defaultdict(int)
+        self._tokens = defaultdict(int)
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """
+        Time a stage. The yielded dict can be filled in by the caller, e.g.
+        span["cached"] = True or record_usage(span, response.usage).
+        """
+        record = {"stage": stage, **attrs}
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["duration"] = time.perf_counter() - started
+            record["ts"] = time.time()
+            self._finish(record)
+
+    def _finish(self, record):
+        stage = record["stage"]
+        with self._lock:
+            self.recent.append(record)
+            self._counts[stage] += 1
+            self._seconds[stage] += record["duration"]
+            self._durations[stage].append(record["duration"])
+            if record.get("error"):
+                self._errors[stage] += 1
+            if record.get("cached"):
+                self._cache_hits[stage] += 1
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if record.get(kind):
+                    self._tokens[(stage, kind)] += record[kind]
+        if METRICS_JSONL_PATH:
+            with open(METRICS_JSONL_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def summary(self):
+        """
+        Per-stage rows: calls, errors, cache hits, total/avg/p95 seconds and tokens.
+        """
+        with self._lock:
+            rows = []
+            for stage, count in sorted(self._counts.items()):
+                window = sorted(self._durations[stage])
+                rows.append({
+                    "stage": stage,
+                    "calls": count,
+                    "errors": self._errors[stage],
+                    "cache_hits": self._cache_hits[stage],
+                    "total_s": round(self._seconds[stage], 6),
+                    "avg_s": round(self._seconds[stage] / count, 4),
+                    "p95_s": round(window[min(len(window) - 1, int(len(window) * 0.95))], 4),
+                    "prompt_tokens": self._tokens[(stage, "prompt_tokens")],
+                    "completion_tokens": self._tokens[(stage, "completion_tokens")],
+                })
+            return rows
+
+    def to_jsonl(self):
+        with self._lock:
+            spans = list(self.recent)
+        return "\n".join(json.dumps(s, ensure_ascii=False, default=str) for s in spans)
+
+    def to_prometheus(self):
+        rows = self.summary()
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+            *(f'{PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{r["stage"]}"}} {r["calls"]}' for r in rows),
+            *(f'{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{r["stage"]}"}} {r["total_s"]:.6f}' for r in rows),
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_errors_total counter",
+            *(f'{PROMETHEUS_PREFIX}_stage_errors_total{{stage="{r["stage"]}"}} {r["errors"]}' for r in rows),
+            f"# TYPE {PROMETHEUS_PREFIX}_cache_hits_total counter",
+            *(f'{PROMETHEUS_PREFIX}_cache_hits_total{{stage="{r["stage"]}"}} {r["cache_hits"]}' for r in rows),
+            f"# TYPE {PROMETHEUS_PREFIX}_tokens_total counter",
+        ]
+        for r in rows:
+            for kind in ("prompt", "completion"):
+                lines.append(f'{PROMETHEUS_PREFIX}_tokens_total{{stage="{r["stage"]}",kind="{kind}"}} {r[f"{kind}_tokens"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            for table in (self._durations, self._counts, self._seconds, self._errors, self._cache_hits, self._tokens):
+                table.clear()
+
+
+def record_usage(span, usage):
+    """
+    Add token counts from an OpenAI `response.usage` to a span; a span that
+    made several calls (retries, repairs) counts all of them.
+    """
+    if usage is not None:
+        span["prompt_tokens"] = span.get("prompt_tokens", 0) + (getattr(usage, "prompt_tokens", 0) or 0)
+        span["completion_tokens"] = span.get("completion_tokens", 0) + (getattr(usage, "completion_tokens", 0) or 0)
+
+
+metrics = Metrics()
@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import exports
+from bot import VARIANT_FIELDS, generate_prompt, generate_prompt_variants
+from presets import PLATFORMS, REFINEMENTS, compose_user_prompt
+from scheduler import BULK
+from translate import translate_prompts
+
+# Column names accepted for the idea/theme of a row
+SUBJECT_FIELDS = ("idea", "theme", "subject", "prompt")
+
+
+def read_jobs(path):
+    """
+    Lazily yield job dicts from a CSV (with a header row) or JSONL file.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _text(value):
+    """
+    A row value as a stripped string; None (empty CSV cell, JSON null) becomes "".
+    """
+    return "" if value is None else str(value).strip()
+
+
+def _platform(value):
+    """
+    Platform id from a row value ("MidJourney", "artisly.ai", ...), or None.
+    """
+    platform = _text(value).lower().removesuffix(".ai")
+    if platform and platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform: {value}")
+    return platform or None
+
+
+def _subject(job):
+    for field in SUBJECT_FIELDS:
+        if _text(job.get(field)):
+            return _text(job[field])
+    return ""
+
+
+def localize(raw, optimized, language):
+    """
+    Translate the raw/optimized pair into `language` (both strings in parallel).
+    """
+    if language == "English":
+        return raw, optimized
+    raw, optimized = translate_prompts([raw, optimized], language)
+    return raw, optimized
+
+
+def localize_variants(variants, language):
+    """
+    Translate every structured variant into `language` in one parallel batch.
+    """
+    if language == "English":
+        return variants
+    return dict(zip(VARIANT_FIELDS, translate_prompts([variants[f] for f in VARIANT_FIELDS], language)))
+
+
+def process_job(index, job, refinement=REFINEMENTS[0], language="English", apply_tips=True, offline=False, export_dir=None, platform=None):
+    """
+    Run one row through compose → generate → split → translate → export.
+    Row values for style/mood/refinement/language/platform override the defaults.
+    """
+    result = {
+        "index": index, "subject": "", "style": "", "mood": "",
+        "refinement": refinement, "language": language, "platform": platform,
+        "prompt": "", "optimized_prompt": "", "midjourney_prompt": "", "artisly_prompt": "", "error": None,
+    }
+    try:
+        # A malformed row fails only its own job, never the whole run
+        if not isinstance(job, dict):
+            raise ValueError(f"expected an object per row, got {type(job).__name__}")
+        subject = _subject(job)
+        style = _text(job.get("style"))
+        mood = _text(job.get("mood"))
+        refinement = _text(job.get("refinement")) or refinement
+        language = _text(job.get("language")) or language
+        platform = _platform(job.get("platform")) or platform
+        result.update(subject=subject, style=style, mood=mood, refinement=refinement, language=language, platform=platform)
+        if refinement == "🪄 Both":
+            if offline:
+                from prompt_engine import generate_offline_variants
+                variants = generate_offline_variants(subject, style, mood, apply_tips)
+            else:
+                variants = generate_prompt_variants(compose_user_prompt(subject, style, mood, apply_tips), priority=BULK)
+            variants = localize_variants(variants, language)
+            raw, optimized = variants["raw"], variants["optimized"]
+            result["midjourney_prompt"], result["artisly_prompt"] = variants["midjourney"], variants["artisly"]
+        else:
+            if offline:
+                from prompt_engine import generate_offline_prompt
+                text = generate_offline_prompt(subject, style, mood, refinement, apply_tips)
+            else:
+                text = generate_prompt(compose_user_prompt(subject, style, mood, apply_tips), refinement, priority=BULK, platform=platform)
+            raw, optimized = localize(text.strip(), "", language)
+        result["prompt"], result["optimized_prompt"] = raw, optimized
+
+        if export_dir:
+            txt = result_txt(result)
+            base = os.path.join(export_dir, f"{index:06d}")
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(txt)
+            with open(f"{base}.pdf", "wb") as f:
+                f.write(exports.build_pdf(txt))
+            result["files"] = [f"{base}.txt", f"{base}.pdf"]
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def run_pipeline(jobs, workers=4, max_in_flight=None, **options):
+    """
+    Stream results for an iterable of jobs, in completion order.
+
+    At most `max_in_flight` jobs are submitted but not yet yielded; the input
+    iterable is only advanced when a slot frees up, so memory stays flat no
+    matter how long the input is.
+    """
+    max_in_flight = max_in_flight or workers * 2
+    if options.get("export_dir"):
+        os.makedirs(options["export_dir"], exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline") as pool:
+        pending = set()
+        for index, job in enumerate(jobs):
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(pool.submit(process_job, index, job, **options))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def result_txt(result):
+    """
+    TXT export of one pipeline or batch result, including its "Both" variants.
+    """
+    variants = {"midjourney": result["midjourney_prompt"], "artisly": result["artisly_prompt"]}
+    return exports.build_txt(result["prompt"], result["optimized_prompt"], variants)
+
+
+def bundle_results(results, bundle):
+    """
+    Pass results through while adding each row's TXT and PDF to a BundleWriter.
+    Runs in the consumer thread, since a ZIP can only be written from one thread.
+    """
+    for result in results:
+        if not result["error"]:
+            txt = result_txt(result)
+            name = f"{result['index']:06d}"
+            bundle.add_text(f"{name}.txt", txt)
+            bundle.add_bytes(f"{name}.pdf", exports.build_pdf(txt))
+        yield result
+
+
+def write_jsonl(results, out):
+    """
+    Write results to a file object one line at a time, flushing as it goes.
+    Returns (written, failed) counts.
+    """
+    written = failed = 0
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        written += 1
+        failed += bool(result["error"])
+    return written, failed
@@ -0,0 +1,128 @@
+# presets.py
+import re
+
+CUSTOM_OPTION = "✏️ Type your own…"
+
+THEMES = [
+    # existing
+    "Elf Queen in an enchanted forest", "Cyberpunk city skyline at night", "Underwater steampunk laboratory",
+    "Haunted Victorian mansion", "Magical animal tea party", "Floating crystal island",
+    "Ancient jungle ruins", "Dreamy cloud kingdom", "Neon Tokyo alleyway", "Surreal clockwork garden",
+    "Galactic dragon shrine", "Rainy street café", "Mythical phoenix rebirth",
+    "Retro-futuristic arcade", "Whimsical flying train", "Alien carnival at dusk",
+    # added popular universes
+    "Marvel Universe", "DC Comics Universe", "Star Wars Galaxy", "Disney Fairytale Kingdom",
+    "Pixar Animated World", "Harry Potter Wizarding World", "Lord of the Rings Middle-earth",
+    "Game of Thrones Westeros", "Avatar: The Last Airbender World", "Pokemon Universe",
+    "Zelda: Hyrule", "Final Fantasy Realm", "Genshin Impact World", "My Hero Academia City"
+]
+
+STYLES = [
+    "Watercolor", "Oil Painting", "Graffiti", "Sketch", "Pop Surrealism", "Lowbrow Art",
+    "Pixel Art", "Digital Matte Painting", "Studio Ghibli Style", "Ink & Wash", "Concept Art",
+    "3D Render", "Chalk Pastel", "Alcohol Ink", "Mosaic Art", "Origami Paper Style",
+    "Vaporwave", "Cyberpunk", "Art Nouveau", "Steampunk", "Tattoo Flash", "Woodcut Print",
+    "Dark Fantasy", "Line Art", "Cartoon",
+    # extra styles
+    "Solarpunk", "Dieselpunk", "Biopunk", "Baroque Engraving", "Ukiyo-e",
+    "Photobashing", "Cinematic Realism", "Isometric Diorama", "Liminal Space",
+    "Low-Poly 3D", "Cel-Shaded", "Pastelcore", "Noir Comic", "Pixel RPG UI",
+    # added realistic styles
+    "3D Realistic", "Photorealism",
+    # 🔥 Etsy-focused outputs
+    "Product Mockup (T-Shirt)", "Product Mockup (Mug)", "Product Mockup (Wall Art)",
+    "Sticker Pack (Die-Cut)", "Sticker (Kiss-Cut)", "Sticker (Holographic Look)",
+    "Clip Art Set (PNG Transparent)", "SVG Clip Art", "Printable Coloring Page",
+    "Seamless Pattern (Repeat Tile)", "Patterned Paper Pack"
+]
+
+MOODS = [
+    "Whimsical", "Mystical", "Ethereal", "Melancholic", "Dreamy", "Uplifting",
+    "Dark Fantasy", "Surreal", "Elegant", "Dramatic", "Romantic", "Peaceful",
+    "Intense", "Futuristic", "Retro", "Minimalist", "Cinematic", "Noir",
+    "Joyful", "Tranquil", "Spooky", "Playful", "Epic", "Spiritual", "Nostalgic",
+    # extra moods
+    "Cozy", "Hopeful", "Somber", "Euphoric", "Wholesome", "Gritty",
+    "Mysterious", "Whirlwind", "Melodic", "Sacred", "Otherworldly", "Zen",
+    "High-Energy", "Cold & Sterile", "Warm & Inviting"
+]
+
+LANGUAGES = [
+    "English", "Spanish", "French", "German", "Portuguese",
+    "Japanese", "Russian", "Chinese", "Korean", "Italian"
+]
+
+REFINEMENTS = ["🔥 Raw creative prompt", "🎯 Optimized for AI clarity", "🪄 Both"]
+# Target generators a prompt can be tailored for, by id
+PLATFORMS = {"midjourney": "MidJourney", "artisly": "Artisly.ai"}
+
+
+def etsy_tips_for_style(style_name: str) -> str:
+    s = (style_name or "").lower()
+
+    if "sticker" in s:
+        return (
+            "Sticker production specs: crisp vector-like edges, high contrast, clean silhouette; "
+            "white offset stroke (2–4px) around subject; transparent background PNG (300 DPI); "
+            "die-cut friendly outline; avoid photo backgrounds."
+        )
+
+    if "clip art" in s or "svg" in s:
+        return (
+            "Clip art set specs: simple shapes, flat fills, smooth paths; clean isolated subject "
+            "on transparent background (PNG 300 DPI) and SVG version; consistent palette and stroke weight."
+        )
+
+    if "mockup" in s:
+        if "t-shirt" in s or "shirt" in s:
+            return (
+                "Apparel mockup specs: front-view unisex crewneck on neutral studio background, "
+                "natural fabric folds, realistic lighting, true-to-size print area; high-res 3000px+."
+            )
+        if "mug" in s:
+            return (
+                "Mug mockup specs: 11oz ceramic mug 3/4 view on minimalist surface, soft shadows, "
+                "centered print area, high-res 3000px+."
+            )
+        if "wall art" in s or "poster" in s:
+            return (
+                "Wall art mockup specs: framed poster on clean wall, soft daylight, slight parallax, "
+                "room decor minimal, no glare; high-res 3000px+."
+            )
+        return (
+            "Product mockup specs: neutral studio scene, accurate proportions, soft realistic shadows, "
+            "no heavy branding; high-res 3000px+."
+        )
+
+    if "pattern" in s or "seamless" in s or "paper pack" in s:
+        return (
+            "Pattern specs: perfectly seamless tile, edges match, repeatable motif, even spacing; "
+            "export square 2048–4096px tile; high contrast and clean edges."
+        )
+
+    if "photoreal" in s or "photorealism" in s or "3d realistic" in s:
+        return (
+            "Photoreal specs: lifelike materials, realistic lighting and shadows, subtle imperfections, "
+            "natural color balance; depth of field and accurate perspective."
+        )
+
+    return ""
+
+
+def compose_user_prompt(subject: str, style: str, mood: str, apply_tips: bool = True) -> str:
+    tips = etsy_tips_for_style(style) if apply_tips else ""
+    return f"{subject}. Style: {style}. Mood: {mood}. {tips}".strip()
+
+
+_COMPOSED = re.compile(r"^(?P<subject>.*)\. Style: (?P<style>.*?)\. Mood: (?P<mood>.*?)\.(?: (?P<tips>.*))?$", re.S)
+
+
+def parse_user_prompt(user_prompt: str):
+    """
+    Inverse of compose_user_prompt: (subject, style, mood, tips), or None for
+    prompts that weren't composed from the three fields.
+    """
+    match = _COMPOSED.match(user_prompt)
+    if not match:
+        return None
+    return match["subject"], match["style"], match["mood"], match["tips"] or ""
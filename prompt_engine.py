@@ -0,0 +1,143 @@
+# Offline prompt engine: composes prompts from the preset vocabularies without
+# calling any API. Used as the zero-latency fallback and for bulk generation.
+import numpy as np
+
+from presets import PLATFORMS, THEMES, STYLES, MOODS, etsy_tips_for_style
+
+LIGHTING = [
+    "soft golden-hour light", "dramatic rim lighting", "glowing bioluminescent light", "moody candlelight",
+    "diffused studio lighting", "neon reflections", "misty morning haze", "volumetric god rays",
+]
+COMPOSITION = [
+    "centered hero composition", "rule-of-thirds framing", "wide establishing shot", "intimate close-up",
+    "symmetrical layout", "dynamic low angle", "isometric view", "layered foreground depth",
+]
+PALETTE = [
+    "pastel palette", "jewel-tone palette", "muted earthy palette", "vibrant neon palette",
+    "monochrome palette with one accent color", "warm sunset palette", "cool teal and violet palette",
+    "soft cream and gold palette",
+]
+ASPECT_RATIOS = ["--ar 2:3", "--ar 3:2", "--ar 1:1", "--ar 4:5"]
+
+# Pre-indexed vocabularies; tips are computed once per style instead of per prompt
+_THEMES = np.array(THEMES, dtype=object)
+_STYLES = np.array(STYLES, dtype=object)
+_STYLE_TIPS = np.array([etsy_tips_for_style(s) for s in STYLES], dtype=object)
+_MOODS = np.array(MOODS, dtype=object)
+_LIGHTING = np.array(LIGHTING, dtype=object)
+_COMPOSITION = np.array(COMPOSITION, dtype=object)
+_PALETTE = np.array(PALETTE, dtype=object)
+_ASPECT_RATIOS = np.array(ASPECT_RATIOS, dtype=object)
+
+
+def _axis(fixed, vocabulary):
+    if fixed:
+        return np.array([fixed], dtype=object)
+    return vocabulary
+
+
+def _tips_axis(style, apply_tips):
+    if not apply_tips:
+        return np.array([""] * (1 if style else len(_STYLES)), dtype=object)
+    if style:
+        return np.array([etsy_tips_for_style(style)], dtype=object)
+    return _STYLE_TIPS
+
+
+def _sample_indices(rng, dims, n):
+    """
+    Draw up to n distinct combinations from the mixed-radix space `dims`, as one
+    index array per axis. Sampling is over combination codes, so results never repeat.
+    """
+    total = int(np.prod(dims, dtype=np.int64))
+    n = min(n, total)
+    codes = rng.choice(total, size=n, replace=False)
+    return np.unravel_index(codes, dims)
+
+
+def _format(platform, theme, style, mood, lighting, composition, palette, aspect_ratio, tips):
+    if platform == "midjourney":
+        text = f"{theme}, {style}, {mood.lower()} mood, {lighting}, {composition}, {palette}"
+        if tips:
+            text += f". {tips}"
+        return f"{text} {aspect_ratio} --v 6"
+    text = f"A {mood.lower()} {style} artwork of {theme}, {lighting}, {composition}, {palette}."
+    return f"{text} {tips}".strip()
+
+
+def _sample_rows(n, theme=None, style=None, mood=None, apply_tips=True, seed=None):
+    """
+    Up to `n` distinct (theme, style, mood, lighting, composition, palette,
+    aspect ratio, tips) combinations, with the pinned fields held fixed.
+    """
+    rng = np.random.default_rng(seed)
+    axes = [
+        _axis(theme, _THEMES),
+        _axis(style, _STYLES),
+        _axis(mood, _MOODS),
+        _LIGHTING,
+        _COMPOSITION,
+        _PALETTE,
+        _ASPECT_RATIOS,
+    ]
+    tips = _tips_axis(style, apply_tips)
+    dims = tuple(len(axis) for axis in axes)
+    index = _sample_indices(rng, dims, n)
+    columns = [axis[i] for axis, i in zip(axes, index)]
+    columns.append(tips[index[1]])
+    return list(zip(*columns))
+
+
+def generate_prompts(n=1, platform="midjourney", theme=None, style=None, mood=None, apply_tips=True, seed=None):
+    """
+    Compose up to `n` unique prompts for `platform`. Any of theme/style/mood can
+    be pinned (including custom text); the rest are sampled from the presets.
+    """
+    if platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform: {platform}")
+    return [_format(platform, *row) for row in _sample_rows(n, theme, style, mood, apply_tips, seed)]
+
+
+def generate_offline_prompt(subject, style, mood, refinement, apply_tips=True, seed=None):
+    """
+    Drop-in stand-in for bot.generate_prompt output, shaped by the refinement
+    mode. "Both" goes through generate_offline_variants instead.
+    """
+    row = _sample_rows(1, subject or None, style or None, mood or None, apply_tips, seed)[0]
+    if refinement == "🎯 Optimized for AI clarity":
+        return _format("midjourney", *row)
+    return _format("artisly", *row)
+
+
+def generate_offline_variants(subject, style, mood, apply_tips=True, seed=None):
+    """
+    Offline counterpart of bot.generate_prompt_variants.
+    """
+    # One combination formatted per platform: variants of one listing, one artwork
+    row = _sample_rows(1, subject or None, style or None, mood or None, apply_tips, seed)[0]
+    artisly, midjourney = _format("artisly", *row), _format("midjourney", *row)
+    return {"raw": artisly, "optimized": midjourney, "midjourney": midjourney, "artisly": artisly}
+
+
+def generate_for_items(items, apply_tips=True, seed=None):
+    """
+    Offline counterpart of batch.run_batch: same result shape, no network calls
+    (so prompts stay in English whatever the item's language).
+    """
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(0, 2 ** 32, size=len(items))
+    results = []
+    for i, (item, item_seed) in enumerate(zip(items, seeds)):
+        if item["refinement"] == "🪄 Both":
+            variants = generate_offline_variants(item["theme"], item["style"], item["mood"], apply_tips, int(item_seed))
+            raw, optimized, midjourney, artisly = (variants[f] for f in ("raw", "optimized", "midjourney", "artisly"))
+        else:
+            text = generate_offline_prompt(
+                item["theme"], item["style"], item["mood"], item["refinement"], apply_tips, int(item_seed)
+            )
+            raw, optimized, midjourney, artisly = text, "", "", ""
+        results.append(dict(
+            item, index=i, prompt=raw, optimized_prompt=optimized,
+            midjourney_prompt=midjourney, artisly_prompt=artisly, error=None,
+        ))
+    return results
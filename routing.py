@@ -0,0 +1,175 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+# Slowest/best first; each model fails over to the next one when it's too slow
+QUALITY_MODEL = os.getenv("QUALITY_MODEL", "gpt-4")
+BALANCED_MODEL = os.getenv("BALANCED_MODEL", "gpt-4o")
+FAST_MODEL = os.getenv("FAST_MODEL", "gpt-4o-mini")
+FAILOVER = {QUALITY_MODEL: BALANCED_MODEL, BALANCED_MODEL: FAST_MODEL}
+
+ROUTING_POLICY = os.getenv("ROUTING_POLICY", "balanced")
+# Fail over once a model's rolling p95 call time passes this many seconds
+P95_BUDGET_S = float(os.getenv("ROUTING_P95_BUDGET", "12"))
+LATENCY_WINDOW = int(os.getenv("ROUTING_LATENCY_WINDOW", "50"))
+# Samples older than this are forgotten, so a model that was failed over
+# away from gets tried again once its bad window has aged out
+LATENCY_MAX_AGE_S = float(os.getenv("ROUTING_LATENCY_MAX_AGE", "300"))
+MIN_SAMPLES = 5
+# A completion cut off at max_tokens is retried this many times with a bigger budget
+TRUNCATION_RETRIES = 1
+TRUNCATION_MAX_TOKENS = 1000
+
+ANY = None
+
+# Policy tables: the first rule whose refinement, platform and input size all
+# match picks the model and sizes max_tokens as input tokens × output_ratio,
+# clamped to [min_tokens, max_tokens]. Refinement "variants" is the structured
+# Both call; platform is "midjourney", "artisly" or None; ANY matches
+# everything. Floors stay at 250 tokens: a full prompt rarely needs more than
+# ~150, and a completion that still hits the cap is retried with double the budget.
+POLICIES = {
+    # What every call used before routing existed
+    "quality": [
+        {"name": "variants", "refinement": "variants", "platform": ANY, "max_input_tokens": ANY,
+         "model": QUALITY_MODEL, "output_ratio": 0, "min_tokens": 900, "max_tokens": 900},
+        {"name": "legacy", "refinement": ANY, "platform": ANY, "max_input_tokens": ANY,
+         "model": QUALITY_MODEL, "output_ratio": 0, "min_tokens": 400, "max_tokens": 400},
+    ],
+    "balanced": [
+        {"name": "variants", "refinement": "variants", "platform": ANY, "max_input_tokens": ANY,
+         "model": BALANCED_MODEL, "output_ratio": 12, "min_tokens": 600, "max_tokens": 900},
+        {"name": "optimized", "refinement": "🎯 Optimized for AI clarity", "platform": ANY, "max_input_tokens": ANY,
+         "model": BALANCED_MODEL, "output_ratio": 6, "min_tokens": 250, "max_tokens": 400},
+        # MidJourney wants descriptor lists and parameters, not prose
+        {"name": "midjourney", "refinement": ANY, "platform": "midjourney", "max_input_tokens": ANY,
+         "model": BALANCED_MODEL, "output_ratio": 6, "min_tokens": 250, "max_tokens": 400},
+        # A bare idea without style tips: little to condition on, so the fast model
+        {"name": "short-idea", "refinement": ANY, "platform": ANY, "max_input_tokens": 32,
+         "model": FAST_MODEL, "output_ratio": 10, "min_tokens": 250, "max_tokens": 400},
+        {"name": "creative", "refinement": ANY, "platform": ANY, "max_input_tokens": ANY,
+         "model": QUALITY_MODEL, "output_ratio": 6, "min_tokens": 250, "max_tokens": 400},
+    ],
+    "fast": [
+        {"name": "variants", "refinement": "variants", "platform": ANY, "max_input_tokens": ANY,
+         "model": FAST_MODEL, "output_ratio": 10, "min_tokens": 600, "max_tokens": 900},
+        {"name": "everything", "refinement": ANY, "platform": ANY, "max_input_tokens": ANY,
+         "model": FAST_MODEL, "output_ratio": 6, "min_tokens": 250, "max_tokens": 400},
+    ],
+}
+
+
+def approx_tokens(text):
+    """
+    Local token estimate without a tokenizer: the larger of ~4 characters and
+    ~0.75 words per token, which holds up for English prose and prompt lists.
+    """
+    if not text:
+        return 0
+    return max(len(text) // 4, round(len(re.findall(r"\S+", text)) * 4 / 3), 1)
+
+
+def _matches(rule, refinement, platform, input_tokens):
+    return (
+        rule["refinement"] in (ANY, refinement)
+        and rule["platform"] in (ANY, platform)
+        and (rule["max_input_tokens"] is ANY or input_tokens <= rule["max_input_tokens"])
+    )
+
+
+class Router:
+    """
+    Picks a model and max_tokens for each completion from a policy table, and
+    keeps a rolling window of observed call times per model. A model whose
+    p95 is over budget is skipped in favour of its FAILOVER model until the
+    slow samples age out.
+    """
+
+    def __init__(self, policy=ROUTING_POLICY, budget=P95_BUDGET_S, window=LATENCY_WINDOW, max_age=LATENCY_MAX_AGE_S):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        self.policy = policy
+        self.budget = budget
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self.failovers = 0
+        self.truncations = 0
+
+    def observe(self, model, seconds):
+        with self._lock:
+            self._latencies[model].append((time.monotonic(), seconds))
+
+    def p95(self, model):
+        """
+        Rolling p95 call time for `model`, or None with too few recent samples.
+        """
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            samples = sorted(s for t, s in self._latencies[model] if t >= cutoff)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def _healthy(self, model):
+        p95 = self.p95(model)
+        return p95 is None or p95 <= self.budget
+
+    def route(self, refinement, user_prompt, platform=None):
+        """
+        {"model", "max_tokens", "rule", "input_tokens", "failover_from"} for one call.
+        """
+        input_tokens = approx_tokens(user_prompt)
+        rules = POLICIES[self.policy]
+        rule = next((r for r in rules if _matches(r, refinement, platform, input_tokens)), rules[-1])
+        max_tokens = min(rule["max_tokens"], max(rule["min_tokens"], input_tokens * rule["output_ratio"]))
+
+        model = rule["model"]
+        failover_from = None
+        while not self._healthy(model) and model in FAILOVER:
+            failover_from = failover_from or model
+            model = FAILOVER[model]
+        if failover_from:
+            with self._lock:
+                self.failovers += 1
+        return {
+            "model": model,
+            "max_tokens": int(max_tokens),
+            "rule": rule["name"],
+            "input_tokens": input_tokens,
+            "failover_from": failover_from,
+        }
+
+    def after_truncation(self, route):
+        """
+        Route for retrying a completion that stopped at max_tokens: the same
+        model with double the budget, up to TRUNCATION_MAX_TOKENS. None when
+        the budget can't grow any further.
+        """
+        with self._lock:
+            self.truncations += 1
+        max_tokens = min(TRUNCATION_MAX_TOKENS, route["max_tokens"] * 2)
+        if max_tokens <= route["max_tokens"]:
+            return None
+        return dict(route, max_tokens=max_tokens)
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self.failovers = 0
+            self.truncations = 0
+
+    def stats(self):
+        with self._lock:
+            models = list(self._latencies)
+        return {
+            "policy": self.policy,
+            "failovers": self.failovers,
+            "truncations": self.truncations,
+            "p95_s": {model: self.p95(model) for model in models},
+        }
+
+
+router = Router()
@@ -0,0 +1,230 @@
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# Account quotas are per model; defaults match usage tier 1. OPENAI_RPM_LIMIT /
+# OPENAI_TPM_LIMIT override every model, OPENAI_TPM_LIMIT_GPT_4O_MINI etc. one model
+MODEL_LIMITS = {
+    "gpt-4": (500, 10000),
+    "gpt-4o": (500, 30000),
+    "gpt-4o-mini": (500, 200000),
+}
+# Models not listed above get gpt-4's quota, the smallest
+DEFAULT_LIMITS = MODEL_LIMITS["gpt-4"]
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+
+# Lower runs first: a click in the UI jumps ahead of queued batch/CLI work
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+
+def estimate_tokens(messages, max_tokens):
+    """
+    Rough upper bound for a chat call: ~4 characters per prompt token, a few
+    tokens of framing per message, plus the full completion budget.
+    """
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + 4 * len(messages) + max_tokens
+
+
+def model_limits(model):
+    """
+    (requests per minute, tokens per minute) for `model`.
+    """
+    rpm, tpm = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+    suffix = re.sub(r"[^A-Z0-9]+", "_", (model or "").upper()).strip("_")
+    rpm = os.getenv(f"OPENAI_RPM_LIMIT_{suffix}") or os.getenv("OPENAI_RPM_LIMIT") or rpm
+    tpm = os.getenv(f"OPENAI_TPM_LIMIT_{suffix}") or os.getenv("OPENAI_TPM_LIMIT") or tpm
+    return int(rpm), int(tpm)
+
+
+class TokenBucket:
+    """
+    Refills continuously at `per_minute / 60` units per second up to `per_minute`.
+    The level may go negative when a call used more than it reserved.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+    def drain(self):
+        self.level = min(self.level, 0.0)
+
+
+class _Lane:
+    """
+    One model's request and token buckets, wait queue and 429 pause.
+    """
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.queue = []
+        self.paused_until = 0.0
+
+
+class Scheduler:
+    """
+    Process-wide admission control for chat completions, shared by every
+    Streamlit session, the batch panel and the CLI pipeline.
+
+    Each model has its own lane, since quotas are per model: request and token
+    buckets sized by model_limits(), and a queue ordered by (priority, arrival)
+    where only the head may take from the buckets, so bulk work can never
+    starve a click. A 429 drains that model's buckets and pauses its whole
+    queue for Retry-After rather than letting each caller back off on its own;
+    calls routed to other models keep going.
+    """
+
+    def __init__(self, limits=model_limits):
+        self._cond = threading.Condition()
+        self._limits = limits
+        self._lanes = {}
+        self._seq = itertools.count()
+        self._waits = {priority: deque(maxlen=200) for priority in PRIORITY_NAMES}
+        self.granted = 0
+        self.throttled = 0
+
+    def _lane(self, model):
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _Lane(*self._limits(model))
+        return lane
+
+    def acquire(self, tokens, priority=INTERACTIVE, model=None):
+        """
+        Block until this call to `model` may start. Returns the seconds spent queued.
+        """
+        ticket = (priority, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            lane = self._lane(model)
+            heapq.heappush(lane.queue, ticket)
+            try:
+                while True:
+                    delay = None
+                    if lane.queue[0] == ticket:
+                        now = time.monotonic()
+                        delay = max(
+                            lane.paused_until - now,
+                            lane.requests.wait_time(1, now),
+                            lane.tokens.wait_time(tokens, now),
+                        )
+                        if delay <= 0:
+                            break
+                    self._cond.wait(delay)
+                lane.requests.take(1)
+                lane.tokens.take(tokens)
+            finally:
+                lane.queue.remove(ticket)
+                heapq.heapify(lane.queue)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._waits[priority].append(waited)
+            self.granted += 1
+        return waited
+
+    def settle(self, reserved, used, model=None):
+        """
+        Return unused reserved tokens once the real usage is known (or charge
+        the overrun, which delays the next caller).
+        """
+        if used is None:
+            return
+        with self._cond:
+            tokens = self._lane(model).tokens
+            tokens.level = min(tokens.capacity, tokens.level + reserved - used)
+            self._cond.notify_all()
+
+    def backoff(self, seconds, model=None):
+        """
+        The API said slow down: pause every caller queued for `model`, not just this one.
+        """
+        with self._cond:
+            lane = self._lane(model)
+            self.throttled += 1
+            lane.paused_until = max(lane.paused_until, time.monotonic() + seconds)
+            lane.requests.drain()
+            lane.tokens.drain()
+            self._cond.notify_all()
+
+    def call(self, fn, tokens, priority=INTERACTIVE, retries=MAX_RETRIES, span=None, model=None):
+        """
+        Run `fn()` once admitted to `model`'s lane; on 429 back off that lane and re-queue,
+        on other transient errors back off exponentially and re-queue.
+        Queue time and retries are recorded on `span` when given.
+        """
+        import openai
+        from transport import retry_after_seconds
+
+        retryable = (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+        for attempt in range(retries + 1):
+            waited = self.acquire(tokens, priority, model)
+            if span is not None:
+                span["queued_s"] = span.get("queued_s", 0.0) + waited
+            try:
+                return fn()
+            except openai.RateLimitError as e:
+                if attempt == retries:
+                    raise
+                self.backoff(retry_after_seconds(e.response, attempt), model)
+            except retryable:
+                if attempt == retries:
+                    raise
+                time.sleep(retry_after_seconds(None, attempt))
+            if span is not None:
+                span["retries"] = attempt + 1
+
+    def stats(self):
+        """
+        Queue depth per priority, recent average wait, throttle count, and
+        headroom and pause per model.
+        """
+        with self._cond:
+            now = time.monotonic()
+            queued = [priority for lane in self._lanes.values() for priority, _ in lane.queue]
+            models = {}
+            for model, lane in self._lanes.items():
+                lane.requests.wait_time(0, now)
+                lane.tokens.wait_time(0, now)
+                models[model] = {
+                    "queued": len(lane.queue),
+                    "paused_s": max(0.0, lane.paused_until - now),
+                    "rpm_available": int(lane.requests.level),
+                    "tpm_available": int(lane.tokens.level),
+                }
+            stats = {
+                "queued": len(queued),
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "paused_s": max((m["paused_s"] for m in models.values()), default=0.0),
+                "models": models,
+            }
+            for priority, name in PRIORITY_NAMES.items():
+                waits = self._waits[priority]
+                stats[f"{name}_queued"] = queued.count(priority)
+                stats[f"{name}_avg_wait_s"] = sum(waits) / len(waits) if waits else 0.0
+            return stats
+
+
+scheduler = Scheduler()
@@ -0,0 +1,215 @@
+import os
+import re
+import threading
+import zlib
+from collections import deque
+
+from presets import parse_user_prompt
+
+# Opt-in: a near-duplicate hit serves another request's completion
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "128"))
+SEMANTIC_CACHE_MAX_ITEMS = int(os.getenv("SEMANTIC_CACHE_MAX_ITEMS", "100000"))
+
+# Only words that never change what is asked for; prepositions (with/without,
+# over/under) and conjunctions carry meaning and stay in
+STOPWORDS = frozenset("a an the".split())
+# Negations must match exactly: "with a dragon" and "without a dragon" only
+# differ by one word and would otherwise score as near-duplicates
+NEGATIONS = frozenset("no not without never none nor neither except non".split())
+# Character n-grams catch plurals and small typos; words carry most of the weight
+NGRAM = 3
+NGRAM_WEIGHT = 0.35
+
+
+def _words(text):
+    words = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _features(text):
+    for word in _words(text):
+        yield word, 1.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - NGRAM + 1):
+            yield padded[i:i + NGRAM], NGRAM_WEIGHT
+
+
+def _negations(text):
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return frozenset(w for w in words if w in NEGATIONS or w.endswith("n't"))
+
+
+def semantic_parts(user_prompt):
+    """
+    Split a prompt into (exact part, fuzzy text). For composed prompts the style
+    and its boilerplate tips must match exactly and only subject + mood are
+    compared, so long shared tips can't make different subjects look alike.
+    Negation words in the fuzzy text are part of the exact part too.
+    """
+    parsed = parse_user_prompt(user_prompt)
+    if parsed is None:
+        return (None, _negations(user_prompt)), user_prompt
+    subject, style, mood, tips = parsed
+    text = f"{subject} {mood}"
+    return (style.strip().lower(), tips, _negations(text)), text
+
+
+class _Partition:
+    """
+    Rows of one namespace: a preallocated float32 matrix plus the cache key of
+    each row. Evicted rows are zeroed (they score 0, which never matches) and
+    their slots reused.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.vectors = None
+        self.keys = []
+        self.free = []
+        self.used = 0
+
+    def add(self, vector, key):
+        import numpy as np
+
+        if self.free:
+            slot = self.free.pop()
+        else:
+            capacity = 0 if self.vectors is None else len(self.vectors)
+            if self.used == capacity:
+                vectors = np.zeros((max(16, capacity * 2), self.dim), dtype=np.float32)
+                if self.vectors is not None:
+                    vectors[:self.used] = self.vectors[:self.used]
+                self.vectors = vectors
+            slot = self.used
+            self.used += 1
+            self.keys.append(None)
+        self.vectors[slot] = vector
+        self.keys[slot] = key
+        return slot
+
+    def remove(self, slot):
+        self.vectors[slot] = 0
+        self.keys[slot] = None
+        self.free.append(slot)
+
+    @property
+    def empty(self):
+        return len(self.free) == self.used
+
+
+class SemanticCache:
+    """
+    Near-duplicate index in front of the exact prompt cache.
+
+    Texts are embedded locally with a signed hashing vectorizer (words plus
+    character trigrams) into L2-normalized float32 rows, so cosine similarity
+    is a matrix product. Rows are kept in one matrix per namespace (model,
+    system message, style…) and each points at an exact prompt_cache key; a
+    query only ever scores the rows of its own namespace. Once `max_items`
+    rows are stored, the oldest row overall is evicted for each new one.
+    """
+
+    def __init__(self, dim=SEMANTIC_CACHE_DIM, max_items=SEMANTIC_CACHE_MAX_ITEMS, threshold=SEMANTIC_CACHE_THRESHOLD):
+        self.dim = dim
+        self.max_items = max_items
+        self.threshold = threshold
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._partitions = {}
+        # (namespace, slot) of every stored row, oldest first
+        self._order = deque()
+
+    def embed(self, texts):
+        """
+        (len(texts), dim) float32 matrix of unit vectors; all-zero rows for empty text.
+        """
+        import numpy as np
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in _features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def add(self, namespace, text, key):
+        vector = self.embed([text])[0]
+        if not vector.any():
+            return
+        with self._lock:
+            if len(self._order) >= self.max_items:
+                oldest, slot = self._order.popleft()
+                partition = self._partitions[oldest]
+                partition.remove(slot)
+                if partition.empty:
+                    del self._partitions[oldest]
+            partition = self._partitions.get(namespace)
+            if partition is None:
+                partition = self._partitions[namespace] = _Partition(self.dim)
+            self._order.append((namespace, partition.add(vector, key)))
+
+    def top_k(self, namespaces, texts, k=5):
+        """
+        Batched lookup: for each (namespace, text) query, up to `k` (key, score)
+        pairs from the same namespace, best first.
+        """
+        import numpy as np
+
+        queries = self.embed(texts)
+        groups = {}
+        for row, namespace in enumerate(namespaces):
+            groups.setdefault(namespace, []).append(row)
+        results = [[] for _ in texts]
+        with self._lock:
+            for namespace, group in groups.items():
+                partition = self._partitions.get(namespace)
+                if partition is None:
+                    continue
+                scores = queries[group] @ partition.vectors[:partition.used].T
+                # k rounds of argmax beat a full argpartition of the (queries × rows)
+                # score matrix by a wide margin for the small k used here
+                rows = np.arange(len(group))
+                for _ in range(min(k, partition.used)):
+                    best = scores.argmax(axis=1)
+                    best_scores = scores[rows, best]
+                    for row, i, score in zip(group, best, best_scores):
+                        if score > 0:
+                            results[row].append((partition.keys[i], float(score)))
+                    scores[rows, best] = -np.inf
+        return results
+
+    def lookup(self, namespace, text):
+        """
+        Best (key, score) in `namespace` at or above the threshold, else None.
+        """
+        matches = self.top_k([namespace], [text], k=1)[0]
+        if matches and matches[0][1] >= self.threshold:
+            return matches[0]
+        return None
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def clear(self):
+        with self._lock:
+            self._partitions = {}
+            self._order.clear()
+            self.hits = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "items": len(self._order), "namespaces": len(self._partitions)}
+
+
+semantic_cache = SemanticCache()
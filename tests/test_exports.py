@@ -0,0 +1,47 @@
+import os
+import threading
+import zipfile
+
+import pytest
+
+import exports
+
+
+@pytest.fixture
+def bundle_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "BUNDLE_DIR", str(tmp_path))
+    exports.clear()
+    return tmp_path
+
+
+def test_concurrent_build_zip_yields_one_valid_bundle(bundle_dir, tmp_path_factory):
+    image = tmp_path_factory.mktemp("images") / "img.png"
+    image.write_bytes(os.urandom(20 * 1024 * 1024))
+    start = threading.Barrier(4)
+    paths, errors = [], []
+
+    def build():
+        start.wait()
+        try:
+            paths.append(exports.build_zip("hello world", [str(image)]))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(paths)) == 1
+    with zipfile.ZipFile(paths[0]) as bundle:
+        assert bundle.testzip() is None
+        assert bundle.namelist() == ["prompt.txt", "prompt.pdf", "preview_1.png"]
+    assert sorted(os.listdir(bundle_dir)) == [os.path.basename(paths[0])]
+
+
+def test_failed_build_zip_leaves_no_partial_file(bundle_dir):
+    with pytest.raises(FileNotFoundError):
+        exports.build_zip("hello world", [str(bundle_dir / "missing.png")])
+    assert os.listdir(bundle_dir) == []
@@ -1,11 +1,88 @@
-from deep_translator import GoogleTranslator
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+
+CACHE_SIZE = 2048
+# Point translations at a local stand-in (see benchmarks/stub_server.py)
+TRANSLATE_BASE_URL = os.getenv("TRANSLATE_BASE_URL")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="translate")
+_local = threading.local()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_translator(target_language):
+    """
+    Reuse one GoogleTranslator per (thread, language). Instances keep mutable
+    request params, so they are not shared across threads.
+    """
+    translators = getattr(_local, "translators", None)
+    if translators is None:
+        translators = _local.translators = {}
+    translator = translators.get(target_language)
+    if translator is None:
+        from deep_translator import GoogleTranslator
+        translator = translators[target_language] = GoogleTranslator(source="auto", target=target_language.lower())
+        if TRANSLATE_BASE_URL:
+            translator._base_url = TRANSLATE_BASE_URL
+    return translator
+
+
+def _cache_key(prompt, target_language):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest(), target_language
+
+
+def _cache_get(key):
+    with _cache_lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+        return value
+
+
+def _cache_set(key, value):
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
 
 def translate_prompt(prompt, target_language):
-    if target_language == "English":
+    if target_language == "English" or not prompt:
         return prompt  # No translation needed
-    try:
-        translated = GoogleTranslator(source="auto", target=target_language.lower()).translate(prompt)
-        return translated
-    except Exception as e:
-        print(f"Translation error: {e}")
-        return prompt  # Fallback to original if translation fails
\ No newline at end of file
+    key = _cache_key(prompt, target_language)
+    with metrics.span("translate_prompt", language=target_language) as span:
+        cached = _cache_get(key)
+        if cached is not None:
+            span["cached"] = True
+            return cached
+        try:
+            translated = get_translator(target_language).translate(prompt)
+            _cache_set(key, translated)
+            return translated
+        except Exception as e:
+            print(f"Translation error: {e}")
+            span["error"] = type(e).__name__
+            return prompt  # Fallback to original if translation fails
+
+
+def translate_prompts(prompts, target_language):
+    """
+    Translate several prompts into the same language in parallel.
+
+    Cached and duplicate strings are not sent again; order is preserved.
+    """
+    if target_language == "English":
+        return list(prompts)
+    pending = {}
+    for prompt in prompts:
+        if prompt and prompt not in pending and _cache_get(_cache_key(prompt, target_language)) is None:
+            pending[prompt] = _executor.submit(translate_prompt, prompt, target_language)
+    translated = {prompt: future.result() for prompt, future in pending.items()}
+    return [translated[p] if p in translated else translate_prompt(p, target_language) for p in prompts]
@@ -0,0 +1,127 @@
+import email.utils
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+MAX_RETRY_WAIT = float(os.getenv("OPENAI_MAX_RETRY_WAIT", "30"))
+
+# Set to e.g. http://127.0.0.1:8765/v1 to run against a local stub server
+BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# Max concurrent in-flight calls per endpoint, per process
+ENDPOINT_LIMITS = {
+    "chat": int(os.getenv("OPENAI_CHAT_CONCURRENCY", "8")),
+    "images": int(os.getenv("OPENAI_IMAGES_CONCURRENCY", "2")),
+    "vision": int(os.getenv("OPENAI_VISION_CONCURRENCY", "2")),
+    "download": int(os.getenv("DOWNLOAD_CONCURRENCY", "4")),
+}
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+_semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in ENDPOINT_LIMITS.items()}
+
+
+def timeout():
+    import httpx
+    return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+@st.cache_resource
+def get_http_client():
+    """
+    Process-wide pooled HTTP client, so repeated calls reuse TLS connections.
+    httpx is imported lazily here and below to keep cold starts cheap.
+    """
+    import httpx
+    return httpx.Client(timeout=timeout(), limits=limits())
+
+
+def new_async_http_client():
+    import httpx
+    return httpx.AsyncClient(timeout=timeout(), limits=limits())
+
+
+@contextmanager
+def endpoint_slot(endpoint):
+    """
+    Hold one of the per-endpoint concurrency slots for the duration of a call.
+    """
+    semaphore = _semaphores[endpoint]
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def retry_after_seconds(response, attempt):
+    """
+    Delay before the next attempt: Retry-After / retry-after-ms when present,
+    otherwise exponential backoff. Capped at MAX_RETRY_WAIT.
+    """
+    headers = response.headers if response is not None else {}
+    delay = None
+    if headers.get("retry-after-ms"):
+        try:
+            delay = float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if delay is None and headers.get("retry-after"):
+        value = headers["retry-after"]
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError, OverflowError):
+                # Malformed date: fall back to the default backoff
+                delay = None
+    if delay is None or not math.isfinite(delay) or delay < 0:
+        delay = 0.5 * (2 ** attempt)
+    return min(delay, MAX_RETRY_WAIT)
+
+
+def download_to_file(url, path, endpoint="download", retries=MAX_RETRIES, chunk_size=64 * 1024):
+    """
+    Stream a response body straight to `path` without holding it in memory.
+    The file only appears once complete, so readers never see a partial image.
+    """
+    import httpx
+    client = get_http_client()
+    partial = f"{path}.part"
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            with endpoint_slot(endpoint), client.stream("GET", url) as response:
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    with open(partial, "wb") as f:
+                        for chunk in response.iter_bytes(chunk_size):
+                            f.write(chunk)
+                    os.replace(partial, path)
+                    return path
+        except (httpx.TimeoutException, httpx.TransportError):
+            if attempt == retries:
+                raise
+        if attempt == retries:
+            response.raise_for_status()
+        time.sleep(retry_after_seconds(response, attempt))